@@ -0,0 +1,160 @@
+"""
+Parsers for Gemini responses.
+
+Gemini is asked for JSON matching SUMMARY_SCHEMA / TODOS_SCHEMA, which is
+decoded in a single json.loads pass over the complete response text
+(AIService never streams model output, so there is no incremental
+parser). The line heuristics are kept only as a
+fallback for non-JSON answers (older prompts, safety rewrites, truncation);
+they use precompiled, anchored patterns instead of loose substring checks.
+"""
+import json
+import re
+from typing import List, Optional, Tuple
+
+MAX_KEY_POINTS = 5
+
+SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "keyPoints": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["summary", "keyPoints"],
+}
+
+TODOS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "todos": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["todos"],
+}
+
+# "1. Özet: ...", "**Özet:** ...", "Summary: ..."
+_SUMMARY_HEADER = re.compile(r"(?:\d+[.)]\s*)?[*_#\s]*(?:özet|summary)[*_\s]*:[*_\s]*(.*)", re.IGNORECASE)
+# "2. Anahtar Noktalar:", "**Key Points**", "Anahtar noktalar" (must be the whole header, not a substring)
+_KEY_POINTS_HEADER = re.compile(
+    r"(?:\d+[.)]\s*)?[*_#\s]*(?:anahtar\s+noktalar(?:ı)?|key\s+points)[*_\s]*:?[*_\s]*(.*)",
+    re.IGNORECASE
+)
+_BULLET = re.compile(r"(?:[-•*]|\d+[.)])\s+(.*)")
+_TODOS_HEADER = re.compile(r"[*_#\s]*TODOS[*_\s]*:[*_\s]*(.*)", re.IGNORECASE)
+_NO_TODOS = re.compile(r"[*_#\s]*NO_TODOS\b", re.IGNORECASE)
+
+
+def _truncate(text: str, limit: int = 200) -> str:
+    return text[:limit] + "..." if len(text) > limit else text
+
+
+def _clean(text: str) -> str:
+    return text.strip().strip("*_").strip()
+
+
+def _load_json_object(text: str) -> Optional[dict]:
+    """Decode a JSON object, tolerating ```json fences or prose around it"""
+    text = text.strip()
+    if not text.startswith("{"):
+        start = text.find("{")
+        end = text.rfind("}")
+        if start == -1 or end <= start:
+            return None
+        text = text[start:end + 1]
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _string_list(value) -> Optional[List[str]]:
+    if not isinstance(value, list):
+        return None
+    return [item.strip() for item in value if isinstance(item, str) and item.strip()]
+
+
+def parse_summary(response: str) -> Tuple[str, List[str]]:
+    """(summary, key points) from a JSON answer, else from the line fallback"""
+    data = _load_json_object(response)
+    if data is not None and isinstance(data.get("summary"), str) and data["summary"].strip():
+        key_points = _string_list(data.get("keyPoints")) or []
+        return data["summary"].strip(), key_points[:MAX_KEY_POINTS]
+    return parse_summary_lines(response)
+
+
+def parse_todos(response: str) -> List[str]:
+    """Todo list from a JSON answer, else from the line fallback"""
+    data = _load_json_object(response)
+    if data is not None:
+        todos = _string_list(data.get("todos"))
+        if todos is not None:
+            return todos
+    return parse_todos_lines(response)
+
+
+def parse_summary_lines(response: str) -> Tuple[str, List[str]]:
+    """Fallback for "Özet: ... / Anahtar Noktalar: - ..." style answers"""
+    summary_parts: List[str] = []
+    key_points: List[str] = []
+    section = None
+
+    for raw_line in response.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        match = _SUMMARY_HEADER.fullmatch(line)
+        if match:
+            section = "summary"
+            rest = _clean(match.group(1))
+            if rest:
+                summary_parts.append(rest)
+            continue
+
+        match = _KEY_POINTS_HEADER.fullmatch(line)
+        if match:
+            section = "key_points"
+            rest = _clean(match.group(1))
+            if rest:
+                key_points.append(rest)
+            continue
+
+        bullet = _BULLET.fullmatch(line)
+        if section == "key_points" or bullet:
+            point = _clean(bullet.group(1) if bullet else line)
+            if point:
+                key_points.append(point)
+        elif section == "summary":
+            summary_parts.append(_clean(line))
+
+    summary = " ".join(part for part in summary_parts if part)
+    if not summary:
+        summary = _truncate(response)
+    return summary, key_points[:MAX_KEY_POINTS]
+
+
+def parse_todos_lines(response: str) -> List[str]:
+    """Fallback for "TODOS: / - ..." or "NO_TODOS" style answers"""
+    todos: List[str] = []
+    in_todos = False
+
+    for raw_line in response.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if _NO_TODOS.match(line):
+            break
+        match = _TODOS_HEADER.fullmatch(line)
+        if match:
+            in_todos = True
+            rest = _clean(match.group(1))
+            if rest:
+                todos.append(rest)
+            continue
+        if in_todos:
+            bullet = _BULLET.fullmatch(line)
+            todo = _clean(bullet.group(1) if bullet else line)
+            if todo:
+                todos.append(todo)
+
+    return todos
@@ -1,18 +1,80 @@
 import os
 import json
+import time
 import asyncio
-import google.generativeai as genai
-from typing import Dict, List
-from config import GEMINI_API_KEY
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from config import (
+    SUMMARY_CHUNK_THRESHOLD,
+    SUMMARY_CHUNK_SIZE,
+    SUMMARY_CHUNK_CONCURRENCY,
+    AI_MAX_OUTPUT_TOKENS,
+    AI_MAX_CONCURRENCY,
+    AI_MODEL_STANDARD
+)
+from content_utils import content_hash, split_content_chunks
+from ai_parsers import SUMMARY_SCHEMA, TODOS_SCHEMA, parse_summary, parse_todos
+from prompts import PROMPTS, estimate_tokens
+from token_usage import token_usage
+from model_router import ModelPool, ModelRouter, local_generate
+from model_clients import create_model_factory
+from cache import cache
+
+# Gemini JSON modu: yanıt şemaya uyan tek bir JSON nesnesi olarak gelir
+SUMMARY_JSON_CONFIG = {"response_mime_type": "application/json", "response_schema": SUMMARY_SCHEMA}
+TODOS_JSON_CONFIG = {"response_mime_type": "application/json", "response_schema": TODOS_SCHEMA}
 
 class AIService:
-    def __init__(self):
-        if not GEMINI_API_KEY or GEMINI_API_KEY == "YOUR_GEMINI_API_KEY_HERE":
-            raise ValueError("GEMINI_API_KEY is not set in environment variables")
+    def __init__(self, model_factory: Optional[Callable[[str], object]] = None):
+        # Model istemcisi AI_BACKEND'e göre seçilir (canlı Gemini, kayıt veya çevrimdışı replay);
+        # her çağrının modeli ModelRouter ile seçilir, istemciler havuzda paylaşılır
+        self.models = ModelPool(model_factory or create_model_factory())
+        self.router = ModelRouter()
+        self.model = self.models.get(AI_MODEL_STANDARD)
+        # Bloklayan model çağrıları varsayılan executor'u (CPU+4 thread) doldurmasın
+        self._executor = ThreadPoolExecutor(max_workers=AI_MAX_CONCURRENCY, thread_name_prefix="ai")
+        
+        # Uzun notlarda parça özetleri eşzamanlı üretilir
+        self._chunk_semaphore = asyncio.Semaphore(SUMMARY_CHUNK_CONCURRENCY)
+    
+    async def _generate(self, prompt_name: str, body: str, generation_config: Optional[Dict] = None) -> str:
+        """
+        PROMPTS[prompt_name] şablonunu token bütçesi içinde doldurur, router'ın
+        seçtiği modeli AIService'in thread pool'unda çağırır ve yanıt metnini döndürür.
+        Gecikme router'a, token kullanımı token_usage'a kaydedilir.
+        """
+        route = self.router.route(prompt_name, len(body))
+        if route.model_name is None:
+            return local_generate(prompt_name, body)
+        
+        prompt = PROMPTS[prompt_name].render(body)
+        model = self.models.get(route.model_name)
+        config = {**(generation_config or {}), "max_output_tokens": AI_MAX_OUTPUT_TOKENS}
+        started = time.monotonic()
+        try:
+            response = await asyncio.get_running_loop().run_in_executor(
+                self._executor,
+                lambda: model.generate_content(prompt, generation_config=config)
+            )
+            text = response.text
+        except asyncio.CancelledError:
+            # Route timeout'u (AI_TIMEOUT) da yavaşlık sayılır
+            self.router.observe(prompt_name, route.tier, time.monotonic() - started, failed=True)
+            raise
+        except Exception as e:
+            self.router.observe(prompt_name, route.tier, time.monotonic() - started, failed=True)
+            raise Exception(f"Gemini API error: {str(e)}")
+        self.router.observe(prompt_name, route.tier, time.monotonic() - started)
         
-        # Gemini API'yi yapılandır
-        genai.configure(api_key=GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        usage = getattr(response, "usage_metadata", None)
+        token_usage.record(
+            prompt_name,
+            route.model_name,
+            estimate_tokens(prompt),
+            getattr(usage, "prompt_token_count", 0) or 0,
+            getattr(usage, "candidates_token_count", 0) or 0
+        )
+        return text
     
     async def summarize_note(self, content: str) -> Dict:
         """
@@ -30,31 +92,12 @@ class AIService:
                     "originalWordCount": word_count
                 }
             
-            # Gemini'ye gönderilecek prompt
-            prompt = f"""
-            Aşağıdaki not içeriğini Türkçe olarak özetleyin ve anahtar noktaları çıkarın.
-            
-            İçerik:
-            {content}
-            
-            Lütfen şu formatta yanıt verin:
-            1. Özet: (2-3 cümlelik kısa özet)
-            2. Anahtar Noktalar: (Her biri bir satırda, maksimum 5 adet)
-            
-            Özet kısa ve öz olsun, anahtar noktalar ise madde madde listelensin.
-            """
-            
-            # Gemini API çağrısı
-            try:
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None, 
-                    lambda: self.model.generate_content(prompt)
-                )
-                
-                ai_response = response.text
-                
-            except Exception as e:
-                raise Exception(f"Gemini API error: {str(e)}")
+            if len(content) > SUMMARY_CHUNK_THRESHOLD or not PROMPTS["summary"].fits(content):
+                # Uzun içerik: parçaları özetle (map), sonra tek geçişte birleştir (reduce)
+                ai_response = await self._summarize_long(content)
+            else:
+                # Gemini API çağrısı
+                ai_response = await self._generate("summary", content, SUMMARY_JSON_CONFIG)
             
             # AI yanıtını parse et
             summary, key_points = self._parse_ai_response(ai_response)
@@ -75,7 +118,8 @@ class AIService:
                 "summary": f"AI özetleme zaman aşımına uğradı. İçeriğin ilk 200 karakteri: {simple_summary}",
                 "keyPoints": [],
                 "wordCount": len(simple_summary.split()),
-                "originalWordCount": word_count
+                "originalWordCount": word_count,
+                "fallback": True
             }
         except Exception as e:
             # Hata durumunda basit özet döndür
@@ -86,53 +130,43 @@ class AIService:
                 "summary": f"AI özetleme hatası: {str(e)}. İçeriğin ilk 200 karakteri: {simple_summary}",
                 "keyPoints": [],
                 "wordCount": len(simple_summary.split()),
-                "originalWordCount": word_count
+                "originalWordCount": word_count,
+                "fallback": True
             }
     
+    async def _summarize_long(self, content: str) -> str:
+        """
+        Map-reduce özetleme: içerik cümle sınırlarında parçalanır, parçalar
+        sınırlı eşzamanlılıkla özetlenir ve kısmi özetler tek bir çağrıda
+        birleştirilir. Ham AI yanıtını (JSON) döndürür. Parçalar prompt bütçesine
+        sığacak boyutta tutulur; birleştirme girdisi bütçeyi aşarsa kırpılır.
+        """
+        chunk_size = min(SUMMARY_CHUNK_SIZE, PROMPTS["summary_chunk"].body_char_budget())
+        chunks = split_content_chunks(content, chunk_size)
+        partial_summaries = await asyncio.gather(*(self._summarize_chunk(chunk) for chunk in chunks))
+        
+        joined = "\n".join(f"- {summary}" for summary in partial_summaries)
+        return await self._generate("summary_reduce", joined, SUMMARY_JSON_CONFIG)
+    
+    async def _summarize_chunk(self, chunk: str) -> str:
+        """
+        Tek bir parçayı özetler. Sonuçlar parça hash'ine göre tüm worker'ların
+        paylaştığı cache'te ("ai_chunks") tutulur, böylece küçük bir düzenlemeden
+        sonra sadece değişen parçalar yeniden özetlenir; aynı parça eşzamanlı
+        istenirse tek bir model çağrısı yapılır.
+        """
+        async def load() -> str:
+            async with self._chunk_semaphore:
+                return (await self._generate("summary_chunk", chunk)).strip()
+        
+        return await cache.get_or_load("ai_chunks", content_hash(chunk), load)
+    
     def _parse_ai_response(self, response: str) -> tuple[str, List[str]]:
         """
-        AI yanıtını parse eder ve özet ile anahtar noktaları ayırır
+        AI yanıtını parse eder ve özet ile anahtar noktaları ayırır.
+        JSON yanıt tek geçişte okunur; JSON değilse satır kurallarına düşer.
         """
-        try:
-            lines = response.strip().split('\n')
-            summary = ""
-            key_points = []
-            
-            current_section = None
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                if "özet:" in line.lower() or "summary:" in line.lower():
-                    current_section = "summary"
-                    # Özet kısmını al
-                    summary_text = line.split(':', 1)[1].strip() if ':' in line else ""
-                    if summary_text:
-                        summary = summary_text
-                elif "anahtar" in line.lower() or "key" in line.lower() or "nokta" in line.lower():
-                    current_section = "key_points"
-                elif current_section == "summary" and not summary:
-                    summary = line
-                elif current_section == "key_points" or (line.startswith('-') or line.startswith('•') or line.startswith('*')):
-                    # Anahtar nokta
-                    point = line.lstrip('-•* ').strip()
-                    if point and len(key_points) < 5:  # Maksimum 5 anahtar nokta
-                        key_points.append(point)
-                elif current_section == "summary" and summary:
-                    # Özet devam ediyor
-                    summary += " " + line
-            
-            # Eğer parse edilemediyse, basit özet oluştur
-            if not summary:
-                summary = response[:200] + "..." if len(response) > 200 else response
-            
-            return summary, key_points
-            
-        except Exception:
-            # Parse hatası durumunda basit döndür
-            return response[:200] + "..." if len(response) > 200 else response, []
+        return parse_summary(response)
 
     async def extract_todos(self, content: str) -> Dict:
         """
@@ -149,40 +183,13 @@ class AIService:
                     "originalContent": content
                 }
             
-            # Gemini'ye gönderilecek prompt
-            prompt = f"""
-            Aşağıdaki metni analiz et ve yapılacak işleri (todo'ları) çıkar.
-            
-            Metin:
-            {content}
-            
-            Lütfen şu formatta yanıt ver:
-            1. Eğer yapılacak iş varsa: "TODOS:" yaz ve her birini ayrı satırda listele
-            2. Eğer yapılacak iş yoksa: "NO_TODOS" yaz
-            
-            Örnek:
-            "Yarın sunum dosyasını tamamla ve Ali'ye gönder"
-            TODOS:
-            - Sunum dosyasını tamamla
-            - Ali'ye gönder
-            
-            Sadece yapılacak işleri çıkar, geçmiş olayları değil.
-            """
-            
-            # Gemini API çağrısı
-            try:
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None, 
-                    lambda: self.model.generate_content(prompt)
+            if PROMPTS["todos"].fits(content):
+                todos = self._parse_todos_response(
+                    await self._generate("todos", content, TODOS_JSON_CONFIG)
                 )
-                
-                ai_response = response.text
-                
-            except Exception as e:
-                raise Exception(f"Gemini API error: {str(e)}")
-            
-            # AI yanıtını parse et
-            todos = self._parse_todos_response(ai_response)
+            else:
+                # Bütçeyi aşan metin parçalara bölünür; her parçanın todo'ları sırayla birleştirilir
+                todos = await self._extract_todos_chunked(content)
             
             return {
                 "hasTodos": len(todos) > 0,
@@ -191,44 +198,41 @@ class AIService:
             }
             
         except Exception as e:
-            # Hata durumunda boş döndür
+            # Hata durumunda boş döndür; fallback işareti sonucun kaydedilmemesi için
             return {
                 "hasTodos": False,
                 "todos": [],
-                "originalContent": content
+                "originalContent": content,
+                "fallback": True
             }
     
+    async def _extract_todos_chunked(self, content: str) -> List[str]:
+        chunks = split_content_chunks(content, PROMPTS["todos"].body_char_budget())
+        
+        async def extract(chunk: str) -> List[str]:
+            async with self._chunk_semaphore:
+                return self._parse_todos_response(await self._generate("todos", chunk, TODOS_JSON_CONFIG))
+        
+        todos: List[str] = []
+        for chunk_todos in await asyncio.gather(*(extract(chunk) for chunk in chunks)):
+            todos.extend(todo for todo in chunk_todos if todo not in todos)
+        return todos
+    
     def _parse_todos_response(self, response: str) -> List[str]:
         """
-        AI yanıtından todo'ları parse eder
+        AI yanıtından todo'ları parse eder (JSON, değilse TODOS:/NO_TODOS satırları)
         """
-        try:
-            lines = response.strip().split('\n')
-            todos = []
-            
-            in_todos_section = False
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                if "TODOS:" in line.upper():
-                    in_todos_section = True
-                    continue
-                elif "NO_TODOS" in line.upper():
-                    break
-                elif in_todos_section:
-                    # Todo satırı
-                    if line.startswith('-') or line.startswith('•') or line.startswith('*'):
-                        todo = line.lstrip('-•* ').strip()
-                        if todo:
-                            todos.append(todo)
-                    elif line and not line.startswith('TODOS:'):
-                        # Satır başında işaret yoksa da todo olabilir
-                        todos.append(line)
-            
-            return todos
-            
-        except Exception:
-            return []
\ No newline at end of file
+        return parse_todos(response)
+
+
+_ai_service: Optional[AIService] = None
+
+def get_ai_service() -> AIService:
+    """
+    Paylaşılan AIService örneğini döndürür (ilk çağrıda oluşturulur).
+    Canlı backend'de GEMINI_API_KEY eksikse ValueError fırlatır.
+    """
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = AIService()
+    return _ai_service
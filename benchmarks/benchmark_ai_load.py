@@ -0,0 +1,168 @@
+"""
+Load test of the AI endpoints against the offline Gemini stand-in.
+
+Sends --requests POST /api/notes/summarize and /api/notes/extract-todos
+calls through the real routes (in-process ASGI, no network) with
+AI_BACKEND=replay, keeping --concurrency requests in flight. Note bodies
+are built from the parser corpus; --long-ratio of them exceed
+SUMMARY_CHUNK_THRESHOLD (map-reduce path) and --repeat-ratio reuse an
+earlier body (chunk cache). Reports throughput, latency percentiles,
+status codes (408 = AI_TIMEOUT hit), fallback answers, model calls per
+prompt/model and the stand-in's injected failures.
+
+    python benchmarks/benchmark_ai_load.py
+    python benchmarks/benchmark_ai_load.py --concurrency 128 --error-rate 0.05 --hang-rate 0.02 --timeout 5
+    python benchmarks/benchmark_ai_load.py --ai-concurrency 5    # model calls limited to 5 threads
+    AI_RECORDINGS_PATH=ai_recordings.jsonl python benchmarks/benchmark_ai_load.py   # replay a recorded session
+
+Recordings come from running the API with AI_BACKEND=record. Runs are
+reproducible for a given --seed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CORPUS = os.path.join(ROOT, "benchmarks", "corpus", "gemini_responses.jsonl")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--todo-ratio", type=float, default=0.5, help="share of extract-todos calls")
+    parser.add_argument("--long-ratio", type=float, default=0.2)
+    parser.add_argument("--repeat-ratio", type=float, default=0.3)
+    parser.add_argument("--timeout", type=float, default=5.0, help="AI_TIMEOUT for the routes")
+    parser.add_argument("--latency-median", type=float, default=0.8)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--ai-concurrency", type=int, default=None, help="AI_MAX_CONCURRENCY (default: config)")
+    parser.add_argument("--seed", default="0")
+    return parser.parse_args()
+
+
+def configure(args):
+    """Stand-in settings go through the environment; config.py reads it on import"""
+    os.environ.update({
+        "AI_BACKEND": "replay",
+        "AI_TIMEOUT": str(args.timeout),
+        "AI_STANDIN_LATENCY_MEDIAN": str(args.latency_median),
+        "AI_STANDIN_LATENCY_SIGMA": str(args.latency_sigma),
+        "AI_STANDIN_ERROR_RATE": str(args.error_rate),
+        "AI_STANDIN_HANG_RATE": str(args.hang_rate),
+        "AI_STANDIN_HANG_SECONDS": str(args.timeout * 2),
+        "AI_STANDIN_SEED": args.seed,
+        "RATE_LIMIT_ENABLED": "false",
+        # Her çalıştırma boş bir paylaşılan cache ile başlar
+        "CACHE_L2_PATH": os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+    })
+    # Bu route'lar Firestore'a dokunmaz; config sadece değişkenlerin varlığını kontrol eder
+    for name in ("FIREBASE_PROJECT_ID", "FIREBASE_PRIVATE_KEY_ID", "FIREBASE_PRIVATE_KEY",
+                 "FIREBASE_CLIENT_EMAIL", "FIREBASE_CLIENT_ID"):
+        os.environ.setdefault(name, "benchmark")
+    if args.ai_concurrency is not None:
+        os.environ["AI_MAX_CONCURRENCY"] = str(args.ai_concurrency)
+
+
+def corpus_sentences():
+    sentences = []
+    with open(CORPUS, encoding="utf-8") as f:
+        for line in f:
+            expected = json.loads(line)["expected"]
+            sentences.extend(s for s in [expected.get("summary", "")] + expected.get("keyPoints", []) if s)
+            sentences.extend(f"Yapılacak: {todo}." for todo in expected.get("todos", []))
+    return sentences
+
+
+def build_bodies(args, long_threshold: int):
+    rng = random.Random(args.seed)
+    sentences = corpus_sentences()
+    bodies = []
+    for _ in range(args.requests):
+        if bodies and rng.random() < args.repeat_ratio:
+            bodies.append(rng.choice(bodies))
+            continue
+        target = long_threshold + 500 if rng.random() < args.long_ratio else rng.randint(80, 800)
+        parts = []
+        while sum(len(part) + 1 for part in parts) < target:
+            parts.append(rng.choice(sentences))
+        bodies.append(" ".join(parts))
+    paths = ["/api/notes/extract-todos" if rng.random() < args.todo_ratio else "/api/notes/summarize"
+             for _ in bodies]
+    return list(zip(paths, bodies))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run(args):
+    import httpx
+
+    from config import SUMMARY_CHUNK_THRESHOLD, AI_MAX_CONCURRENCY
+    from ai_service import get_ai_service
+    from token_usage import token_usage
+    from main import app
+
+    calls = build_bodies(args, SUMMARY_CHUNK_THRESHOLD)
+    service = get_ai_service()
+    latencies = []
+    statuses = Counter()
+    fallbacks = 0
+    queue = asyncio.Queue()
+    for call in calls:
+        queue.put_nowait(call)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def worker():
+            nonlocal fallbacks
+            while not queue.empty():
+                path, body = queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.post(path, json={"content": body})
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] += 1
+                # Servis hataları 200 ile yedek cevap döner
+                if response.status_code == 200 and "AI özetleme" in response.json().get("summary", ""):
+                    fallbacks += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"requests {len(calls)}  concurrency {args.concurrency}  AI_TIMEOUT {args.timeout}s  "
+          f"AI_MAX_CONCURRENCY {AI_MAX_CONCURRENCY}")
+    print(f"throughput {len(calls) / elapsed:8.1f} req/s  ({elapsed:.1f}s)")
+    print(f"latency    p50 {percentile(latencies, 0.50) * 1000:7.0f} ms  "
+          f"p95 {percentile(latencies, 0.95) * 1000:7.0f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:7.0f} ms  "
+          f"mean {statistics.mean(latencies) * 1000:7.0f} ms")
+    print(f"status     {dict(sorted(statuses.items()))}  summary fallbacks {fallbacks}")
+    print("model calls:")
+    for row in sorted(token_usage.snapshot(), key=lambda row: (row["prompt"], row["model"])):
+        print(f"  {row['prompt']:<15} {row['model']:<22} {row['calls']:6d}")
+    for model_name, model in sorted(service.models.created().items()):
+        print(f"  stand-in {model_name:<22} {model.stats}")
+
+
+def main():
+    args = parse_args()
+    configure(args)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Hit rate and cost of the shared cache across worker processes.
+
+Starts WORKERS processes that each look up REQUESTS Zipf-distributed keys
+with cache.get_or_load(); a miss costs LOAD_MS (like a Firestore read).
+Runs once with L1 only (every worker has its own cold copy) and once with
+the shared SQLite L2, then prints loads, hit rates and per-lookup time, plus
+the raw L1 / L2 hit latency in one process.
+
+    python benchmarks/benchmark_cache.py
+
+Env: WORKERS (default 4), REQUESTS per worker (default 5000), KEYS
+(default 2000), LOAD_MS (default 5).
+"""
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import SharedCache
+
+WORKERS = int(os.getenv("WORKERS", "4"))
+REQUESTS = int(os.getenv("REQUESTS", "5000"))
+KEYS = int(os.getenv("KEYS", "2000"))
+LOAD_MS = float(os.getenv("LOAD_MS", "5"))
+NAMESPACES = f"bench=300:{KEYS // 4}:{KEYS * 2}"
+
+
+def zipf_keys(seed: int, count: int):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(KEYS)]
+    return [f"note-{key}" for key in rng.choices(range(KEYS), weights=weights, k=count)]
+
+
+async def lookups(path, keys):
+    cache = SharedCache(path=path, namespaces=NAMESPACES)
+
+    async def load():
+        await asyncio.sleep(LOAD_MS / 1000)
+        return {"title": "x" * 200, "todos": ["a", "b"]}
+
+    started = time.perf_counter()
+    for key in keys:
+        await cache.get_or_load("bench", key, load)
+    return dict(cache.counters["bench"]), time.perf_counter() - started
+
+
+def worker(path, seed, results):
+    results.put(asyncio.run(lookups(path, zipf_keys(seed, REQUESTS))))
+
+
+def run_workers(path):
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(path, seed, results)) for seed in range(WORKERS)]
+    for process in processes:
+        process.start()
+    totals, elapsed = {}, []
+    for _ in processes:
+        counters, seconds = results.get()
+        elapsed.append(seconds)
+        for name, value in counters.items():
+            totals[name] = totals.get(name, 0) + value
+    for process in processes:
+        process.join()
+    return totals, max(elapsed)
+
+
+async def hit_latency(path):
+    cache = SharedCache(path=path, namespaces=NAMESPACES, poll_seconds=3600)
+    value = {"title": "x" * 200, "todos": ["a", "b"]}
+    await cache.set("bench", "hot", value)
+    iterations = 20000
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await cache.get("bench", "hot")
+    l1 = (time.perf_counter() - started) / iterations * 1e6
+
+    iterations = 2000
+    started = time.perf_counter()
+    for _ in range(iterations):
+        cache._l1["bench"].clear()
+        await cache.get("bench", "hot")
+    l2 = (time.perf_counter() - started) / iterations * 1e6
+    print(f"L1 hit {l1:8.2f} µs   L2 hit {l2:8.2f} µs")
+
+
+def main():
+    print(f"{WORKERS} workers x {REQUESTS} lookups, {KEYS} keys (zipf), load {LOAD_MS} ms")
+    print(f"{'mode':<10} {'loads':>7} {'l1 hits':>8} {'l2 hits':>8} {'hit rate':>9} {'time (s)':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, path in (("L1 only", None), ("L1 + L2", os.path.join(tmp, "cache.sqlite3"))):
+            totals, elapsed = run_workers(path)
+            lookups = WORKERS * REQUESTS
+            hits = totals.get("l1_hits", 0) + totals.get("l2_hits", 0)
+            print(f"{mode:<10} {totals.get('loads', 0):7d} {totals.get('l1_hits', 0):8d} "
+                  f"{totals.get('l2_hits', 0):8d} {hits / lookups:9.1%} {elapsed:9.2f}")
+        asyncio.run(hit_latency(os.path.join(tmp, "latency.sqlite3")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Cold start and first-request latency.
+
+Starts a single-worker server.py, measures the time until GET /health answers
+(process start -> ready), then times the first and second calls to an
+endpoint. Run with WARMUP_ON_STARTUP=true/false to compare.
+
+    python benchmarks/benchmark_cold_start.py
+    python benchmarks/benchmark_cold_start.py --path /api/notes/summarize \\
+        --body '{"content": "Yarın sunum dosyasını tamamla ve Ali'"'"'ye gönder"}'
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def timed_request(port: int, method: str, path: str, body: str = None) -> float:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    headers = {"Content-Type": "application/json"} if body else {}
+    started = time.perf_counter()
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--body", default=None)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    method = "POST" if args.body else "GET"
+
+    print(f"{'run':>4} {'ready (s)':>10} {'1st req (ms)':>13} {'2nd req (ms)':>13}")
+    for run in range(1, args.runs + 1):
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "server.py", "--workers", "1", "--port", str(args.port), "--host", "127.0.0.1"],
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        try:
+            while True:
+                try:
+                    timed_request(args.port, "GET", "/health")
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            ready = time.perf_counter() - started
+            first = timed_request(args.port, method, args.path, args.body)
+            second = timed_request(args.port, method, args.path, args.body)
+            print(f"{run:>4} {ready:>10.2f} {first * 1000:>13.1f} {second * 1000:>13.1f}")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+CPU cost vs. bytes saved for typical GET /api/notes payloads.
+
+Builds note lists shaped like NoteResponse JSON (Turkish-like text sampled
+from a word list) and reports, per codec and level: compressed size, ratio
+and compression time. Use it to tune COMPRESSION_MIN_SIZE, the levels and
+COMPRESSION_OFFLOAD_SIZE.
+
+    python benchmarks/benchmark_compression.py
+"""
+import gzip
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+WORDS = (
+    "toplantı proje rapor sunum yarın bugün hafta müşteri ekip görev tamamla gönder hazırla "
+    "kontrol et ara not fikir uygulama flutter backend api veri tasarım test hata düzelt "
+    "plan bütçe market süt ekmek randevu doktor okul ödev kitap oku yaz güncelle incele "
+    "ve ile için ama çünkü sonra önce gibi daha çok az bir bu şu o ben sen biz"
+).split()
+
+
+def make_notes(count: int, content_chars: int, seed: int = 42) -> bytes:
+    rnd = random.Random(seed)
+    now = datetime(2025, 1, 7, 10, 0, 0)
+    notes = []
+    for i in range(count):
+        words = []
+        while sum(len(w) + 1 for w in words) < content_chars:
+            words.append(rnd.choice(WORDS))
+        content = " ".join(words)[:content_chars]
+        notes.append({
+            "title": " ".join(rnd.choice(WORDS) for _ in range(4)).capitalize(),
+            "content": content,
+            "id": str(uuid.UUID(int=rnd.getrandbits(128))),
+            "owner_uid": "Xq3fK9pLm2VbN7cR1tYw8ZaD4eH6",
+            "created_at": (now - timedelta(days=i)).isoformat(),
+            "updated_at": (now - timedelta(hours=i)).isoformat(),
+            "dirty": False,
+            "deleted": False,
+            "hasTodos": i % 3 == 0,
+            "todos": ["Sunum dosyasını tamamla", "Ali'ye gönder"] if i % 3 == 0 else []
+        })
+    return json.dumps(notes, ensure_ascii=False).encode("utf-8")
+
+
+def codecs():
+    for level in (1, 6, 9):
+        yield f"gzip-{level}", lambda data, level=level: gzip.compress(data, compresslevel=level, mtime=0)
+    if brotli is not None:
+        for quality in (1, 4, 6, 11):
+            yield f"br-{quality}", lambda data, quality=quality: brotli.compress(data, quality=quality)
+    if zstandard is not None:
+        for level in (1, 3, 9):
+            yield f"zstd-{level}", lambda data, level=level: zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def measure(func, data: bytes) -> (int, float):
+    runs = max(3, min(200, int(2_000_000 / max(len(data), 1))))
+    started = time.perf_counter()
+    for _ in range(runs):
+        compressed = func(data)
+    return len(compressed), (time.perf_counter() - started) / runs
+
+
+def main():
+    payloads = [
+        ("1 note x 200 chars", make_notes(1, 200)),
+        ("5 notes x 200 chars", make_notes(5, 200)),
+        ("20 notes x 1000 chars", make_notes(20, 1000)),
+        ("100 notes x 2000 chars", make_notes(100, 2000)),
+        ("100 notes x 10000 chars", make_notes(100, 10000)),
+    ]
+    for name, data in payloads:
+        print(f"\n{name}: {len(data):,} bytes")
+        print(f"  {'codec':<9} {'bytes':>10} {'ratio':>7} {'time (ms)':>10} {'MB/s':>8}")
+        for codec_name, func in codecs():
+            size, seconds = measure(func, data)
+            print(
+                f"  {codec_name:<9} {size:>10,} {len(data) / size:>6.1f}x "
+                f"{seconds * 1000:>10.3f} {len(data) / seconds / 1e6:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
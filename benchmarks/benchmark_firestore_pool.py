@@ -0,0 +1,109 @@
+"""
+Throughput of the pooled Firestore clients at high concurrency.
+
+Runs against the Firestore emulator and compares pool sizes (one gRPC
+channel per client) with CONCURRENCY requests in flight from one process,
+the way one API worker issues them through firebase_config.run_db:
+
+    firebase emulators:start --only firestore     # listens on localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/benchmark_firestore_pool.py
+
+Env: CONCURRENCY (default 128), DURATION seconds per pool size (default 10),
+POOL_SIZES (default "1,2,4,8"), WRITE_RATIO (default 0.2).
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Emülatör servis hesabı istemez; config sadece değişkenlerin varlığını kontrol eder (config import'undan önce)
+os.environ.setdefault("FIREBASE_PROJECT_ID", "demo-notes")
+for name in ("FIREBASE_PRIVATE_KEY_ID", "FIREBASE_PRIVATE_KEY", "FIREBASE_CLIENT_EMAIL",
+             "FIREBASE_CLIENT_ID", "GEMINI_API_KEY"):
+    os.environ.setdefault(name, "benchmark")
+
+from google.auth.credentials import AnonymousCredentials
+
+from firestore_pool import create_client_pool
+
+CONCURRENCY = int(os.getenv("CONCURRENCY", "128"))
+DURATION = float(os.getenv("DURATION", "10"))
+POOL_SIZES = [int(size) for size in os.getenv("POOL_SIZES", "1,2,4,8").split(",")]
+WRITE_RATIO = float(os.getenv("WRITE_RATIO", "0.2"))
+PROJECT = os.getenv("FIREBASE_PROJECT_ID", "demo-notes")
+NOTE_COUNT = 200
+
+
+def seed(db):
+    batch = db.batch()
+    for i in range(NOTE_COUNT):
+        batch.set(db.collection("notes").document(f"bench-{i}"), {
+            "id": f"bench-{i}", "title": f"Not {i}", "content": "Yarın sunumu tamamla " * 20,
+            "owner_uid": "bench-user", "deleted": False
+        })
+    batch.commit()
+
+
+async def run(pool_size: int) -> dict:
+    clients = create_client_pool(AnonymousCredentials(), PROJECT, pool_size)
+    executor = ThreadPoolExecutor(max_workers=CONCURRENCY)
+    loop = asyncio.get_running_loop()
+    counter = iter(range(10 ** 9))
+    latencies = []
+    errors = 0
+
+    def call():
+        db = clients[next(counter) % len(clients)]
+        ref = db.collection("notes").document(f"bench-{random.randrange(NOTE_COUNT)}")
+        if random.random() < WRITE_RATIO:
+            ref.update({"updated_at": time.time()})
+        else:
+            ref.get()
+
+    # Her kanalı bir kez aç; bağlantı kurulumu ölçüme girmesin
+    await asyncio.gather(*(loop.run_in_executor(executor, lambda db=db: db.collection("notes").document("bench-0").get()) for db in clients))
+
+    deadline = time.perf_counter() + DURATION
+
+    async def client_loop():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                await loop.run_in_executor(executor, call)
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - started
+    executor.shutdown()
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors
+    }
+
+
+def main():
+    if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        sys.exit("Set FIRESTORE_EMULATOR_HOST (e.g. localhost:8080) to point at the Firestore emulator")
+
+    seed(create_client_pool(AnonymousCredentials(), PROJECT, 1)[0])
+    print(f"{CONCURRENCY} concurrent requests, {DURATION:.0f}s per run, {WRITE_RATIO:.0%} writes\n")
+    print(f"{'channels':>8} {'req/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'errors':>7}")
+    for pool_size in POOL_SIZES:
+        result = asyncio.run(run(pool_size))
+        print(f"{pool_size:>8} {result['rps']:>9.0f} {result['p50']:>9.1f} {result['p99']:>9.1f} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Accuracy and speed of the Gemini response parsers.
+
+Runs every sample in benchmarks/corpus/gemini_responses.jsonl through the
+legacy line parser (the pre-JSON AIService._parse_ai_response /
+_parse_todos_response, copied below as the baseline) and through ai_parsers,
+then reports exact-match accuracy, per-call time and the samples each parser
+gets wrong.
+
+    python benchmarks/benchmark_parsers.py
+"""
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ai_parsers import parse_summary, parse_todos
+
+CORPUS = os.path.join(ROOT, "benchmarks", "corpus", "gemini_responses.jsonl")
+
+
+def legacy_parse_summary(response):
+    lines = response.strip().split('\n')
+    summary = ""
+    key_points = []
+    current_section = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if "özet:" in line.lower() or "summary:" in line.lower():
+            current_section = "summary"
+            summary_text = line.split(':', 1)[1].strip() if ':' in line else ""
+            if summary_text:
+                summary = summary_text
+        elif "anahtar" in line.lower() or "key" in line.lower() or "nokta" in line.lower():
+            current_section = "key_points"
+        elif current_section == "summary" and not summary:
+            summary = line
+        elif current_section == "key_points" or (line.startswith('-') or line.startswith('•') or line.startswith('*')):
+            point = line.lstrip('-•* ').strip()
+            if point and len(key_points) < 5:
+                key_points.append(point)
+        elif current_section == "summary" and summary:
+            summary += " " + line
+    if not summary:
+        summary = response[:200] + "..." if len(response) > 200 else response
+    return summary, key_points
+
+
+def legacy_parse_todos(response):
+    lines = response.strip().split('\n')
+    todos = []
+    in_todos_section = False
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if "TODOS:" in line.upper():
+            in_todos_section = True
+            continue
+        elif "NO_TODOS" in line.upper():
+            break
+        elif in_todos_section:
+            if line.startswith('-') or line.startswith('•') or line.startswith('*'):
+                todo = line.lstrip('-•* ').strip()
+                if todo:
+                    todos.append(todo)
+            elif line and not line.startswith('TODOS:'):
+                todos.append(line)
+    return todos
+
+
+PARSERS = {
+    "legacy": {"summary": legacy_parse_summary, "todos": legacy_parse_todos},
+    "ai_parsers": {"summary": parse_summary, "todos": parse_todos},
+}
+
+
+def load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run(parser, sample):
+    if sample["kind"] == "summary":
+        summary, key_points = parser["summary"](sample["response"])
+        return {"summary": summary, "keyPoints": key_points}
+    return {"todos": parser["todos"](sample["response"])}
+
+
+def measure(parser, samples, rounds: int = 2000) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for sample in samples:
+            run(parser, sample)
+    return (time.perf_counter() - started) / (rounds * len(samples))
+
+
+def main():
+    samples = load_corpus()
+    print(f"{len(samples)} samples from {os.path.relpath(CORPUS, ROOT)}\n")
+    print(f"{'parser':<11} {'format':<6} {'correct':>9} {'accuracy':>9} {'µs/call':>8}")
+
+    failures = {}
+    for name, parser in PARSERS.items():
+        for fmt in ("json", "text"):
+            subset = [s for s in samples if s["format"] == fmt]
+            wrong = [s["id"] for s in subset if run(parser, s) != s["expected"]]
+            failures.setdefault(name, []).extend(wrong)
+            correct = len(subset) - len(wrong)
+            print(
+                f"{name:<11} {fmt:<6} {correct:>4}/{len(subset):<4} "
+                f"{correct / len(subset):>8.0%} {measure(parser, subset) * 1e6:>8.2f}"
+            )
+
+    for name, wrong in failures.items():
+        print(f"\n{name} mismatches: {', '.join(wrong) if wrong else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
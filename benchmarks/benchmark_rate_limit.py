@@ -0,0 +1,74 @@
+"""
+Hot-path overhead of the rate limiter.
+
+1. Raw consume() cost of the memory and SQLite backends over many distinct keys.
+2. End-to-end ASGI request cost of a trivial route with and without the
+   rate_limit_client dependency (in-process, no network).
+
+    python benchmarks/benchmark_rate_limit.py
+    RATE_LIMIT_BACKEND=sqlite python benchmarks/benchmark_rate_limit.py   # request cost with another backend
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Limit yüksek tutulur ki ölçüm 429 cevaplarına takılmasın (config import'undan önce)
+os.environ.setdefault("RATE_LIMIT_CRUD_PER_MINUTE", "100000000")
+# Ölçüm Firestore'a ve Gemini'ye dokunmaz; config sadece değişkenlerin varlığını kontrol eder
+for name in ("FIREBASE_PROJECT_ID", "FIREBASE_PRIVATE_KEY_ID", "FIREBASE_PRIVATE_KEY",
+             "FIREBASE_CLIENT_EMAIL", "FIREBASE_CLIENT_ID", "GEMINI_API_KEY"):
+    os.environ.setdefault(name, "benchmark")
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from config import RATE_LIMIT_BACKEND
+from rate_limit import InMemoryRateLimitBackend, SQLiteRateLimitBackend, rate_limit_client
+
+
+async def bench_backend(name: str, backend, iterations: int, keys: int):
+    started = time.perf_counter()
+    for i in range(iterations):
+        await backend.consume(f"crud:uid:{i % keys}", 1_000_000, 1000.0)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<8} consume    {elapsed / iterations * 1e6:8.2f} µs/call  ({keys} keys)")
+
+
+async def bench_requests(iterations: int):
+    app = FastAPI()
+
+    @app.get("/plain")
+    async def plain():
+        return {"ok": True}
+
+    @app.get("/limited", dependencies=[Depends(rate_limit_client("crud"))])
+    async def limited():
+        return {"ok": True}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = {}
+        for path in ("/plain", "/limited"):
+            for _ in range(200):
+                await client.get(path)
+            started = time.perf_counter()
+            for _ in range(iterations):
+                await client.get(path)
+            results[path] = (time.perf_counter() - started) / iterations * 1e6
+    print(f"request /plain      {results['/plain']:8.2f} µs/request")
+    print(f"request /limited    {results['/limited']:8.2f} µs/request")
+    print(f"limiter overhead    {results['/limited'] - results['/plain']:8.2f} µs/request  (RATE_LIMIT_BACKEND={RATE_LIMIT_BACKEND})")
+
+
+async def main():
+    await bench_backend("memory", InMemoryRateLimitBackend(), 200_000, 10_000)
+    with tempfile.TemporaryDirectory() as tmp:
+        await bench_backend("sqlite", SQLiteRateLimitBackend(os.path.join(tmp, "ratelimit.sqlite3")), 20_000, 10_000)
+    await bench_requests(5_000)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Throughput vs. worker count for server.py.
+
+Starts `server.py --workers N` for each N, hammers GET /health with keep-alive
+client processes (so the client is not the bottleneck) and prints req/s.
+
+    python benchmarks/benchmark_workers.py --workers 1 2 4 --duration 10
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_until_ready(port: int, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+
+def client_loop(args):
+    port, path, duration = args
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    count = 0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        count += 1
+    return count
+
+
+def run(workers: int, port: int, clients: int, duration: float, path: str) -> float:
+    server = subprocess.Popen(
+        [sys.executable, "server.py", "--workers", str(workers), "--port", str(port), "--host", "127.0.0.1"],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(port)
+        with multiprocessing.Pool(clients) as pool:
+            # Warm-up pass so every worker has finished booting before measuring
+            pool.map(client_loop, [(port, path, 2.0)] * clients)
+            counts = pool.map(client_loop, [(port, path, duration)] * clients)
+        return sum(counts) / duration
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/health")
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        rps = run(workers, args.port, args.clients, args.duration, args.path)
+        baseline = baseline or rps
+        print(f"{workers:>8} {rps:>10.0f} {rps / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
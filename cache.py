@@ -0,0 +1,406 @@
+"""Two-level cache (per-worker LRU + SQLite file) shared by the uvicorn workers of one host"""
+# Değerler JSON olmalı ve paylaşıldığı için değiştirilmemeli; ayrıntılar docs/deployment.md "Caching"
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from config import (
+    CACHE_ENABLED,
+    CACHE_L2_PATH,
+    CACHE_NAMESPACES,
+    CACHE_INVALIDATION_POLL_SECONDS,
+    CACHE_LEASE_SECONDS
+)
+
+_MISSING = object()
+_TRIM_EVERY = 100  # L2 boyut sınırı her N yazmada bir uygulanır
+_LEASE_POLL_SECONDS = 0.05
+# Bu süreden eski invalidation'lar yarış kontrolü için tutulmaz
+_INVALIDATION_RETENTION_SECONDS = 600
+
+
+class NamespaceConfig(NamedTuple):
+    ttl: float
+    l1_size: int
+    l2_size: int
+
+
+def parse_namespaces(spec: str) -> Dict[str, NamespaceConfig]:
+    """"notes=10:1000:20000,..." -> {"notes": NamespaceConfig(10.0, 1000, 20000), ...}"""
+    namespaces = {}
+    for part in spec.split(","):
+        name, _, limits = part.strip().partition("=")
+        if not name:
+            continue
+        ttl, l1_size, l2_size = limits.split(":")
+        namespaces[name] = NamespaceConfig(float(ttl), int(l1_size), int(l2_size))
+    return namespaces
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_expiry ON entries (namespace, expires_at);
+CREATE TABLE IF NOT EXISTS invalidations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS invalidations_key ON invalidations (namespace, key, created_at);
+CREATE TABLE IF NOT EXISTS leases (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+
+class SQLiteStore:
+    """L2 side of SharedCache; all methods run on the cache's single I/O thread"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get(self, namespace: str, key: str, now: float) -> Optional[Tuple[str, float]]:
+        return self._db().execute(
+            "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, now)
+        ).fetchone()
+
+    def set(self, namespace: str, key: str, value: str, expires_at: float, loaded_since: float) -> bool:
+        """Store unless the key was invalidated at or after loaded_since"""
+        cursor = self._db().execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at) "
+            "SELECT ?, ?, ?, ? WHERE NOT EXISTS ("
+            "  SELECT 1 FROM invalidations WHERE namespace = ? AND key = ? AND created_at >= ?)",
+            (namespace, key, value, expires_at, namespace, key, loaded_since)
+        )
+        return cursor.rowcount > 0
+
+    def invalidate(self, keys: List[Tuple[str, str]], now: float):
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", keys)
+            db.executemany(
+                "INSERT INTO invalidations (namespace, key, created_at) VALUES (?, ?, ?)",
+                [(namespace, key, now) for namespace, key in keys]
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def invalidations_since(self, last_id: Optional[int]) -> Tuple[int, List[tuple]]:
+        """(newest id, rows after last_id); a new worker starts from the newest id"""
+        db = self._db()
+        if last_id is None:
+            newest = db.execute("SELECT COALESCE(MAX(id), 0) FROM invalidations").fetchone()[0]
+            return newest, []
+        rows = db.execute(
+            "SELECT id, namespace, key, created_at FROM invalidations WHERE id > ? ORDER BY id",
+            (last_id,)
+        ).fetchall()
+        return (rows[-1][0] if rows else last_id), rows
+
+    def acquire_lease(self, namespace: str, key: str, owner: str, now: float, seconds: float) -> bool:
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("DELETE FROM leases WHERE namespace = ? AND key = ? AND expires_at <= ?", (namespace, key, now))
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO leases (namespace, key, owner, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, owner, now + seconds)
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return cursor.rowcount > 0
+
+    def peek_peer(self, namespace: str, key: str, now: float) -> Tuple[Optional[Tuple[str, float]], bool]:
+        """(entry row, whether some worker still holds a live lease on the key)"""
+        leased = self._db().execute(
+            "SELECT 1 FROM leases WHERE namespace = ? AND key = ? AND expires_at > ?", (namespace, key, now)
+        ).fetchone() is not None
+        return self.get(namespace, key, now), leased
+
+    def release_lease(self, namespace: str, key: str, owner: str):
+        self._db().execute("DELETE FROM leases WHERE namespace = ? AND key = ? AND owner = ?", (namespace, key, owner))
+
+    def trim(self, namespace: str, max_entries: int, now: float):
+        """Drop expired rows, then the entries closest to expiry beyond max_entries"""
+        db = self._db()
+        db.execute("DELETE FROM entries WHERE namespace = ? AND expires_at <= ?", (namespace, now))
+        db.execute(
+            "DELETE FROM entries WHERE namespace = ? AND key IN ("
+            "  SELECT key FROM entries WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (namespace, namespace, max_entries)
+        )
+        db.execute("DELETE FROM invalidations WHERE created_at < ?", (now - _INVALIDATION_RETENTION_SECONDS,))
+        db.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+
+
+class SharedCache:
+    def __init__(
+        self,
+        path: Optional[str] = CACHE_L2_PATH,
+        namespaces: str = CACHE_NAMESPACES,
+        enabled: bool = CACHE_ENABLED,
+        poll_seconds: float = CACHE_INVALIDATION_POLL_SECONDS,
+        lease_seconds: float = CACHE_LEASE_SECONDS
+    ):
+        self.enabled = enabled
+        self.namespaces = parse_namespaces(namespaces)
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._l1: Dict[str, "OrderedDict[str, tuple]"] = {name: OrderedDict() for name in self.namespaces}
+        self._l2 = SQLiteStore(path) if path else None
+        # sqlite bağlantısı tek thread'de kullanılır; L1 isabetleri bu thread'e hiç uğramaz
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache")
+        self._owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        # (namespace, key) -> son invalidation zamanı (yükleme ile yazma yarışını yakalamak için)
+        self._invalidated_at: Dict[Tuple[str, str], float] = {}
+        self._last_invalidation_id: Optional[int] = None
+        self._next_poll = 0.0
+        self._writes = Counter()
+        self.counters = {name: Counter() for name in self.namespaces}
+
+    async def _l2_call(self, func, *args, default=None):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        except sqlite3.Error as e:
+            print(f"Cache L2 error ({func.__name__}): {e}")
+            return default
+
+    def _put_l1(self, namespace: str, key: str, value: Any, expires_at: float):
+        entries = self._l1[namespace]
+        entries[key] = (expires_at, value)
+        entries.move_to_end(key)
+        while len(entries) > self.namespaces[namespace].l1_size:
+            entries.popitem(last=False)
+
+    def _forget(self, namespace: str, key: str, invalidated_at: float):
+        if namespace not in self._l1:
+            return
+        self._l1[namespace].pop(key, None)
+        self._invalidated_at[(namespace, key)] = max(invalidated_at, self._invalidated_at.get((namespace, key), 0.0))
+
+    def _invalidated_since(self, namespace: str, key: str, since: float) -> bool:
+        return self._invalidated_at.get((namespace, key), 0.0) >= since
+
+    async def _sync_invalidations(self):
+        """Apply other workers' invalidations to L1 (at most every poll_seconds)"""
+        if self._l2 is None or time.monotonic() < self._next_poll:
+            return
+        self._next_poll = time.monotonic() + self.poll_seconds
+        result = await self._l2_call(self._l2.invalidations_since, self._last_invalidation_id)
+        if result is None:
+            return
+        self._last_invalidation_id, rows = result
+        for _, namespace, key, created_at in rows:
+            self._forget(namespace, key, created_at)
+        if len(self._invalidated_at) > 10000:
+            cutoff = time.time() - _INVALIDATION_RETENTION_SECONDS
+            self._invalidated_at = {k: at for k, at in self._invalidated_at.items() if at >= cutoff}
+
+    async def _get(self, namespace: str, key: str) -> Any:
+        counters = self.counters[namespace]
+        await self._sync_invalidations()
+        started = time.time()
+        entry = self._l1[namespace].get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > started:
+                self._l1[namespace].move_to_end(key)
+                counters["l1_hits"] += 1
+                return value
+            del self._l1[namespace][key]
+
+        if self._l2 is not None:
+            row = await self._l2_call(self._l2.get, namespace, key, started)
+            if row is not None:
+                value = json.loads(row[0])
+                if not self._invalidated_since(namespace, key, started):
+                    self._put_l1(namespace, key, value, row[1])
+                counters["l2_hits"] += 1
+                return value
+        counters["misses"] += 1
+        return _MISSING
+
+    async def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        if not self.enabled:
+            return default
+        value = await self._get(namespace, key)
+        return default if value is _MISSING else value
+
+    async def set(self, namespace: str, key: str, value: Any, loaded_since: Optional[float] = None) -> bool:
+        """
+        Store value in both levels. With loaded_since (time.time() when the
+        value was read from the source), nothing is stored if the key has been
+        invalidated since then. Returns whether the value was stored.
+        """
+        if not self.enabled:
+            return False
+        config = self.namespaces[namespace]
+        since = loaded_since if loaded_since is not None else float("inf")
+        if self._invalidated_since(namespace, key, since):
+            return False
+
+        expires_at = time.time() + config.ttl
+        if self._l2 is not None:
+            payload = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+            stored = await self._l2_call(self._l2.set, namespace, key, payload, expires_at, since)
+            if stored is False:
+                return False
+            self._writes[namespace] += 1
+            if self._writes[namespace] % _TRIM_EVERY == 0:
+                await self._l2_call(self._l2.trim, namespace, config.l2_size, time.time())
+            # L2 beklenirken yerel bir invalidation gelmiş olabilir
+            if self._invalidated_since(namespace, key, since):
+                return False
+        self._put_l1(namespace, key, value, expires_at)
+        return True
+
+    async def invalidate(self, namespace: str, *keys: str):
+        await self.invalidate_many([(namespace, key) for key in keys])
+
+    async def invalidate_many(self, keys: Iterable[Tuple[str, str]]):
+        """Drop keys here, in L2 and (via the invalidation log) in every other worker's L1"""
+        if not self.enabled:
+            return
+        keys = [(namespace, key) for namespace, key in keys if namespace in self.namespaces]
+        now = time.time()
+        for namespace, key in keys:
+            self._forget(namespace, key, now)
+        if self._l2 is not None and keys:
+            await self._l2_call(self._l2.invalidate, keys, now)
+
+    async def get_or_load(self, namespace: str, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cached value, or loader()'s result stored in the cache. Concurrent
+        callers for the same key (in this worker or, through a lease, in
+        other workers) wait for one load instead of all calling loader.
+        Exceptions from loader are raised to every waiter and not cached.
+        Namespaces missing from CACHE_NAMESPACES are not cached.
+        """
+        if not self.enabled or namespace not in self.namespaces:
+            return await loader()
+        value = await self._get(namespace, key)
+        if value is not _MISSING:
+            return value
+
+        flight_key = (namespace, key)
+        while flight_key in self._inflight:
+            future = self._inflight[flight_key]
+            self.counters[namespace]["coalesced"] += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Yükleyen istek iptal edildiyse (ör. route timeout) yükleme burada tekrarlanır
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[flight_key] = future
+        try:
+            value = await self._load(namespace, key, loader)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Bekleyen yoksa "exception was never retrieved" uyarısı çıkmasın
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[flight_key]
+
+    async def _load(self, namespace: str, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        leased = None  # None: L2 yok ya da hata verdi, kilitsiz yüklenir
+        if self._l2 is not None:
+            leased = await self._l2_call(
+                self._l2.acquire_lease, namespace, key, self._owner, time.time(), self.lease_seconds
+            )
+            if leased is False:
+                value = await self._wait_for_peer(namespace, key)
+                if value is not _MISSING:
+                    return value
+        try:
+            loaded_since = time.time()
+            value = await loader()
+            self.counters[namespace]["loads"] += 1
+            await self.set(namespace, key, value, loaded_since=loaded_since)
+            return value
+        finally:
+            if leased is True:
+                await self._l2_call(self._l2.release_lease, namespace, key, self._owner)
+
+    async def _wait_for_peer(self, namespace: str, key: str) -> Any:
+        """
+        Another worker holds the lease: poll L2 for its value. Gives up when
+        the lease is released without a value (the load failed) or expires.
+        """
+        self.counters[namespace]["lease_waits"] += 1
+        deadline = time.monotonic() + self.lease_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_LEASE_POLL_SECONDS)
+            result = await self._l2_call(self._l2.peek_peer, namespace, key, time.time())
+            if result is None:
+                break
+            row, leased = result
+            if row is not None:
+                self.counters[namespace]["l2_hits"] += 1
+                return json.loads(row[0])
+            if not leased:
+                break
+        return _MISSING
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "l2Path": self._l2.path if self._l2 is not None else None,
+            "namespaces": {
+                name: {
+                    "ttlSeconds": config.ttl,
+                    "l1Entries": len(self._l1[name]),
+                    "l1MaxEntries": config.l1_size,
+                    "l2MaxEntries": config.l2_size,
+                    **self.counters[name]
+                }
+                for name, config in self.namespaces.items()
+            }
+        }
+
+
+# Worker başına tek örnek; L2 dosyası aynı host'taki tüm worker'larca paylaşılır
+cache = SharedCache()
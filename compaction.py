@@ -0,0 +1,205 @@
+"""
+Tombstone compaction: hard-deletes soft-deleted notes older than the
+retention window in rate-limited batches.
+
+    python compaction.py --retention-days 7 --dry-run
+"""
+import argparse
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from firebase_config import get_db
+from config import (
+    TOMBSTONE_RETENTION_DAYS,
+    COMPACTION_BATCH_SIZE,
+    COMPACTION_MAX_DELETES_PER_SECOND,
+    COMPACTION_INTERVAL_HOURS,
+    COMPACTION_LEASE_SECONDS
+)
+
+CHECKPOINT_COLLECTION = "maintenance"
+CHECKPOINT_DOCUMENT = "tombstone_compaction"
+
+
+def _value_size(value) -> int:
+    """Firestore storage size of a field value"""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode("utf-8")) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_value_size(v) for v in value)
+    if isinstance(value, dict):
+        return sum(len(k.encode("utf-8")) + 1 + _value_size(v) for k, v in value.items())
+    if hasattr(value, "latitude"):
+        return 16
+    if hasattr(value, "path"):
+        return _document_name_size(value.path)
+    return 8
+
+
+def _document_name_size(path: str) -> int:
+    return sum(len(segment.encode("utf-8")) + 1 for segment in path.split("/")) + 16
+
+
+def estimate_document_size(path: str, data: dict) -> int:
+    """Storage size of a document per Firestore's documented size calculation"""
+    return _document_name_size(path) + _value_size(data) + 32
+
+
+def _acquire_lease(db, checkpoint_ref, lease_seconds: float) -> bool:
+    from google.cloud import firestore
+
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    now = datetime.now(timezone.utc)
+
+    @firestore.transactional
+    def take(transaction):
+        snapshot = checkpoint_ref.get(transaction=transaction)
+        data = snapshot.to_dict() or {}
+        lease_until = data.get("lease_until")
+        if lease_until is not None and lease_until > now and data.get("lease_owner") != owner:
+            return False
+        transaction.set(checkpoint_ref, {
+            "lease_owner": owner,
+            "lease_until": now + timedelta(seconds=lease_seconds)
+        }, merge=True)
+        return True
+
+    return take(db.transaction())
+
+
+def purge_deleted_notes(
+    retention_days: float = TOMBSTONE_RETENTION_DAYS,
+    batch_size: int = COMPACTION_BATCH_SIZE,
+    max_deletes_per_second: float = COMPACTION_MAX_DELETES_PER_SECOND,
+    dry_run: bool = False
+) -> Optional[dict]:
+    """
+    Hard-delete tombstones whose updated_at is older than the retention window.
+    Returns a report dict, or None if another process holds the lease.
+    """
+    db = get_db()
+    checkpoint_ref = db.collection(CHECKPOINT_COLLECTION).document(CHECKPOINT_DOCUMENT)
+
+    if not dry_run and not _acquire_lease(db, checkpoint_ref, COMPACTION_LEASE_SECONDS):
+        print("Compaction skipped: another process holds the lease")
+        return None
+
+    checkpoint = checkpoint_ref.get().to_dict() or {}
+    if checkpoint.get("status") == "running" and not dry_run:
+        # Yarıda kalmış çalışmaya devam et: aynı cutoff, birikmiş sayaçlar
+        cutoff = checkpoint["cutoff"]
+        purged_docs = checkpoint.get("purged_docs", 0)
+        purged_bytes = checkpoint.get("purged_bytes", 0)
+        print(f"Resuming compaction run (cutoff {cutoff.isoformat()}, {purged_docs} docs purged so far)")
+    else:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+        purged_docs = 0
+        purged_bytes = 0
+        if not dry_run:
+            checkpoint_ref.set({
+                "status": "running",
+                "cutoff": cutoff,
+                "started_at": datetime.now(timezone.utc),
+                "purged_docs": 0,
+                "purged_bytes": 0
+            }, merge=True)
+
+    query = (db.collection("notes")
+             .where("deleted", "==", True)
+             .where("updated_at", "<", cutoff)
+             .order_by("updated_at")
+             .limit(batch_size))
+    min_batch_seconds = batch_size / max_deletes_per_second if max_deletes_per_second > 0 else 0
+    last_doc = None
+
+    while True:
+        batch_started = time.monotonic()
+        page = query.start_after(last_doc) if dry_run and last_doc is not None else query
+        docs = list(page.stream())
+        if not docs:
+            break
+
+        batch_bytes = sum(estimate_document_size(doc.reference.path, doc.to_dict()) for doc in docs)
+        if dry_run:
+            # Nothing is deleted, so page through with a cursor instead
+            last_doc = docs[-1]
+        else:
+            write_batch = db.batch()
+            for doc in docs:
+                write_batch.delete(doc.reference)
+            write_batch.commit()
+
+        purged_docs += len(docs)
+        purged_bytes += batch_bytes
+
+        if not dry_run:
+            checkpoint_ref.set({
+                "purged_docs": purged_docs,
+                "purged_bytes": purged_bytes,
+                "last_updated_at": docs[-1].to_dict().get("updated_at"),
+                "lease_until": datetime.now(timezone.utc) + timedelta(seconds=COMPACTION_LEASE_SECONDS)
+            }, merge=True)
+
+        if len(docs) < batch_size:
+            break
+        # Yazma hızını sınırla
+        elapsed = time.monotonic() - batch_started
+        if elapsed < min_batch_seconds:
+            time.sleep(min_batch_seconds - elapsed)
+
+    report = {
+        "cutoff": cutoff.isoformat(),
+        "purged_docs": purged_docs,
+        "purged_bytes": purged_bytes,
+        "dry_run": dry_run
+    }
+    if not dry_run:
+        checkpoint_ref.set({
+            "status": "completed",
+            "completed_at": datetime.now(timezone.utc),
+            "lease_until": None,
+            "last_report": report
+        }, merge=True)
+    print(f"Compaction {'(dry run) ' if dry_run else ''}done: {purged_docs} tombstones, ~{purged_bytes} bytes")
+    return report
+
+
+async def compaction_loop(interval_hours: float = COMPACTION_INTERVAL_HOURS):
+    """In-app scheduler: run compaction every interval_hours (started from main.lifespan)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, purge_deleted_notes)
+        except Exception as e:
+            print(f"Compaction error: {e}")
+        await asyncio.sleep(interval_hours * 3600)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Purge soft-deleted notes older than the retention window")
+    parser.add_argument("--retention-days", type=float, default=TOMBSTONE_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=COMPACTION_BATCH_SIZE)
+    parser.add_argument("--max-deletes-per-second", type=float, default=COMPACTION_MAX_DELETES_PER_SECOND)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be purged")
+    args = parser.parse_args()
+
+    purge_deleted_notes(
+        retention_days=args.retention_days,
+        batch_size=min(args.batch_size, 500),
+        max_deletes_per_second=args.max_deletes_per_second,
+        dry_run=args.dry_run
+    )
+
+
+if __name__ == "__main__":
+    main()
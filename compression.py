@@ -0,0 +1,148 @@
+import gzip
+from typing import Callable, Dict, Optional
+
+import anyio
+
+from config import (
+    COMPRESSION_MIN_SIZE,
+    COMPRESSION_OFFLOAD_SIZE,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_ZSTD_LEVEL
+)
+
+# Optional codecs: `pip install brotli zstandard`
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _build_codecs() -> Dict[str, Callable[[bytes], bytes]]:
+    """Available encodings in server preference order (best ratio/speed first)"""
+    codecs = {}
+    if zstandard is not None:
+        # ZstdCompressor is not thread-safe and cheap to build, so one per call
+        codecs["zstd"] = lambda data: zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compress(data)
+    if brotli is not None:
+        codecs["br"] = lambda data: brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY)
+    codecs["gzip"] = lambda data: gzip.compress(data, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+    return codecs
+
+
+CODECS = _build_codecs()
+
+# Already compressed or streamed incrementally (SSE) content is never buffered
+_SKIP_CONTENT_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip", "application/gzip")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick an encoding from an Accept-Encoding header. Highest q-value wins;
+    ties go to the server preference order of CODECS.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in CODECS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing complete (non-streaming) responses with the
+    negotiated encoding. Bodies below minimum_size are sent as-is; bodies of
+    offload_size or more are compressed in a worker thread so large note lists
+    do not block the event loop. Streaming responses pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE, offload_size: int = COMPRESSION_OFFLOAD_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+
+        encoding = negotiate_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = dict((k.lower(), v) for k, v in start_message.get("headers", []))
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or b"content-encoding" in headers
+                or content_type.startswith(_SKIP_CONTENT_TYPES)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            codec = CODECS[encoding]
+            if len(body) >= self.offload_size:
+                compressed = await anyio.to_thread.run_sync(codec, body)
+            else:
+                compressed = codec(body)
+
+            raw_headers = [
+                (k, v) for k, v in start_message.get("headers", [])
+                if k.lower() not in (b"content-length", b"vary")
+            ]
+            vary = headers.get(b"vary")
+            raw_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"),
+            ]
+            await send({**start_message, "headers": raw_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # .env dosyası yoksa hata vermesin
@@ -21,13 +22,154 @@ HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", "8000"))
 DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 
+# Production Server Configuration (server.py)
+# WORKERS=0 -> CPU sayısına göre otomatik belirlenir
+WORKERS = int(os.getenv("WORKERS", os.getenv("WEB_CONCURRENCY", "0")))
+KEEP_ALIVE_TIMEOUT = int(os.getenv("KEEP_ALIVE_TIMEOUT", "30"))
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "10"))
+BACKLOG = int(os.getenv("BACKLOG", "2048"))
+# X-Forwarded-For'a güvenilen proxy adresleri (virgülle, "*" = hepsi); load balancer arkasında
+# IP bazlı rate limit gerçek istemci IP'sini ancak LB adresleri burada olursa görür
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+# Startup warm-up: gRPC kanallarını ve Firebase public key'lerini önceden aç
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "True").lower() == "true"
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "10"))
+
+# Rate Limiting (token bucket per uid, or per IP for unauthenticated routes)
+# memory: her worker limitin 1/RATE_LIMIT_WORKERS'ını tutar; sqlite: host'taki worker'lar tek dosyayı paylaşır (yavaş); redis: tüm host'lar paylaşır
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_WORKERS = max(1, int(os.getenv("RATE_LIMIT_WORKERS", "1")))  # server.py worker sayısını yazar
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "connectinno-notes-ratelimit.sqlite3"))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_CRUD_PER_MINUTE = int(os.getenv("RATE_LIMIT_CRUD_PER_MINUTE", "120"))
+RATE_LIMIT_AI_PER_MINUTE = int(os.getenv("RATE_LIMIT_AI_PER_MINUTE", "10"))
+
+# Response Compression (gzip; brotli/zstd when the packages are installed)
+# Varsayılanlar benchmarks/benchmark_compression.py sonuçlarına göre seçildi
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # byte
+COMPRESSION_OFFLOAD_SIZE = int(os.getenv("COMPRESSION_OFFLOAD_SIZE", "32768"))  # byte, üstü thread'de sıkıştırılır
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "4"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+# Live note change feed (GET /api/notes/stream)
+STREAM_MAX_FEEDS = int(os.getenv("STREAM_MAX_FEEDS", "500"))  # worker başına Firestore listener sayısı
+STREAM_IDLE_TIMEOUT = float(os.getenv("STREAM_IDLE_TIMEOUT", "60"))  # abonesi kalmayan listener'ın kapanma süresi
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+STREAM_MAX_CONNECTION_SECONDS = float(os.getenv("STREAM_MAX_CONNECTION_SECONDS", "3600"))
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "100"))
+
+# Bulk export/import (NDJSON)
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+IMPORT_BATCH_SIZE = min(int(os.getenv("IMPORT_BATCH_SIZE", "400")), 499)  # WriteBatch limiti 500; 1 yazma istatistik dokümanı için
+IMPORT_MAX_LINE_BYTES = int(os.getenv("IMPORT_MAX_LINE_BYTES", "1048576"))
+# Commit isteği 10 MiB ile sınırlı ve FIREBASE_TIMEOUT içinde bitmeli; batch'ler bu boyutta da kesilir
+IMPORT_BATCH_MAX_BYTES = min(int(os.getenv("IMPORT_BATCH_MAX_BYTES", "4194304")), 9 * 1024 * 1024)
+
+# Tombstone compaction (compaction.py) - soft-delete edilmiş notların kalıcı silinmesi
+TOMBSTONE_RETENTION_DAYS = float(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+COMPACTION_BATCH_SIZE = min(int(os.getenv("COMPACTION_BATCH_SIZE", "200")), 500)
+COMPACTION_MAX_DELETES_PER_SECOND = float(os.getenv("COMPACTION_MAX_DELETES_PER_SECOND", "200"))
+COMPACTION_INTERVAL_HOURS = float(os.getenv("COMPACTION_INTERVAL_HOURS", "0"))  # 0 = uygulama içinde çalıştırma (cron kullan)
+COMPACTION_LEASE_SECONDS = float(os.getenv("COMPACTION_LEASE_SECONDS", "600"))
+
+# Per-user note statistics (note_stats.py); 0 = uygulama içinde uzlaştırma yapma (cron kullan)
+STATS_RECONCILE_INTERVAL_HOURS = float(os.getenv("STATS_RECONCILE_INTERVAL_HOURS", "0"))
+
+# Idempotent note creation (Idempotency-Key header / client note ID)
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+
 # Timeout Configuration
 REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "10"))
 FIREBASE_TIMEOUT = int(os.getenv("FIREBASE_TIMEOUT", "5"))
 
+# Firestore client tuning (firestore_pool.py)
+# Birden fazla gRPC kanalı/istemci round-robin kullanılır; FIREBASE_TIMEOUT tek
+# istek (get/commit) süresi, FIRESTORE_STREAM_TIMEOUT sorgu akışlarının süresidir
+FIRESTORE_CHANNEL_POOL_SIZE = int(os.getenv("FIRESTORE_CHANNEL_POOL_SIZE", "4"))
+# Bloklayan Firestore çağrıları event loop dışında bu kadar thread'de çalışır (worker başına)
+FIRESTORE_MAX_CONCURRENCY = int(os.getenv("FIRESTORE_MAX_CONCURRENCY", "128"))
+FIRESTORE_STREAM_TIMEOUT = float(os.getenv("FIRESTORE_STREAM_TIMEOUT", "30"))
+FIRESTORE_RETRY_INITIAL = float(os.getenv("FIRESTORE_RETRY_INITIAL", "0.1"))
+FIRESTORE_RETRY_MAXIMUM = float(os.getenv("FIRESTORE_RETRY_MAXIMUM", "2.0"))
+FIRESTORE_RETRY_MULTIPLIER = float(os.getenv("FIRESTORE_RETRY_MULTIPLIER", "2.0"))
+FIRESTORE_RETRY_DEADLINE = float(os.getenv("FIRESTORE_RETRY_DEADLINE", "15"))
+FIRESTORE_KEEPALIVE_TIME_MS = int(os.getenv("FIRESTORE_KEEPALIVE_TIME_MS", "30000"))
+FIRESTORE_KEEPALIVE_TIMEOUT_MS = int(os.getenv("FIRESTORE_KEEPALIVE_TIMEOUT_MS", "10000"))
+FIRESTORE_KEEPALIVE_PERMIT_WITHOUT_CALLS = os.getenv("FIRESTORE_KEEPALIVE_PERMIT_WITHOUT_CALLS", "False").lower() == "true"
+
 # AI Configuration - Sadece .env'den al
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Uzun notlar için parçalı (map-reduce) özetleme
+SUMMARY_CHUNK_THRESHOLD = int(os.getenv("SUMMARY_CHUNK_THRESHOLD", "3000"))  # karakter
+SUMMARY_CHUNK_SIZE = int(os.getenv("SUMMARY_CHUNK_SIZE", "2000"))  # karakter
+SUMMARY_CHUNK_CONCURRENCY = int(os.getenv("SUMMARY_CHUNK_CONCURRENCY", "4"))
+SUMMARY_CHUNK_CACHE_SIZE = int(os.getenv("SUMMARY_CHUNK_CACHE_SIZE", "1024"))
+
+# Not oluşturma/güncelleme sonrası özeti arka planda hesapla ve dokümana kaydet
+PRECOMPUTE_SUMMARIES = os.getenv("PRECOMPUTE_SUMMARIES", "False").lower() == "true"
+
+# Prompt token bütçeleri (prompts.py / token_usage.py)
+# Token sayısı gönderimden önce offline tahmin edilir (karakter / AI_CHARS_PER_TOKEN);
+# gerçek sayılar yanıttaki usage_metadata'dan kaydedilir
+AI_PROMPT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", "8000"))
+AI_MAX_OUTPUT_TOKENS = int(os.getenv("AI_MAX_OUTPUT_TOKENS", "1024"))
+AI_CHARS_PER_TOKEN = float(os.getenv("AI_CHARS_PER_TOKEN", "3.5"))
+
+# Model routing (model_router.py)
+# Kurallar "prompt:min_karakter=tier" biçiminde; en büyük eşleşen eşik kazanır.
+# Tier'lar: local (model çağrısı yok, sezgisel), fast, standard, strong
+AI_MODEL_FAST = os.getenv("AI_MODEL_FAST", "gemini-1.5-flash-8b")
+AI_MODEL_STANDARD = os.getenv("AI_MODEL_STANDARD", "gemini-1.5-flash")
+AI_MODEL_STRONG = os.getenv("AI_MODEL_STRONG", "gemini-1.5-pro")
+AI_ROUTING_RULES = os.getenv(
+    "AI_ROUTING_RULES",
+    "summary:0=fast,summary:1500=standard,summary_chunk:0=fast,summary_reduce:0=strong,todos:0=fast"
+)
+# Prompt başına gecikme hedefi (saniye); gözlenen gecikme aşarsa bir alt tier'a düşülür
+AI_LATENCY_SLOS = os.getenv("AI_LATENCY_SLOS", "summary=6,summary_chunk=6,summary_reduce=15,todos=4")
+AI_DOWNGRADE_SECONDS = float(os.getenv("AI_DOWNGRADE_SECONDS", "60"))
+
+# Route'ların AI çağrısı başına bekleme süresi (saniye); aşılırsa 408 / fallback
+AI_TIMEOUT = float(os.getenv("AI_TIMEOUT", "35"))
+# Aynı anda yürüyen model çağrısı (AIService'in kendi thread pool'u; varsayılan executor CPU+4 thread)
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "64"))
+
+# Model istemcisi (model_clients.py)
+# gemini: canlı API, record: canlı API + yanıtları AI_RECORDINGS_PATH'e yaz,
+# replay: çevrimdışı stand-in (kayıtlar + benchmarks/corpus örnekleri, API anahtarı gerekmez)
+AI_BACKEND = os.getenv("AI_BACKEND", "gemini").lower()
+AI_RECORDINGS_PATH = os.getenv("AI_RECORDINGS_PATH", "./ai_recordings.jsonl")
+# Stand-in davranışı: log-normal gecikme, hata ve takılma oranları
+AI_STANDIN_LATENCY_MEDIAN = float(os.getenv("AI_STANDIN_LATENCY_MEDIAN", "0.8"))  # saniye
+AI_STANDIN_LATENCY_SIGMA = float(os.getenv("AI_STANDIN_LATENCY_SIGMA", "0.5"))
+AI_STANDIN_LATENCY_SCALE = float(os.getenv("AI_STANDIN_LATENCY_SCALE", "1.0"))  # kayıtlı gecikmeler de ölçeklenir
+AI_STANDIN_ERROR_RATE = float(os.getenv("AI_STANDIN_ERROR_RATE", "0"))
+AI_STANDIN_HANG_RATE = float(os.getenv("AI_STANDIN_HANG_RATE", "0"))
+AI_STANDIN_HANG_SECONDS = float(os.getenv("AI_STANDIN_HANG_SECONDS", "60"))
+AI_STANDIN_SEED = os.getenv("AI_STANDIN_SEED", "0")
+
+# Çok katmanlı cache (cache.py): L1 = worker içi LRU, L2 = aynı host'taki worker'ların paylaştığı SQLite dosyası
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "True").lower() == "true"
+CACHE_L2_PATH = os.getenv("CACHE_L2_PATH", os.path.join(tempfile.gettempdir(), "connectinno-notes-cache.sqlite3"))  # boş = sadece L1
+# "namespace=ttl_saniye:l1_kayıt:l2_kayıt"; listede olmayan namespace cache'lenmez.
+# notes/stats opsiyoneldir (ör. "notes=10:1000:20000,stats=10:1000:20000"): invalidation host dışına
+# çıkmaz, başka host'taki yazmalar TTL boyunca görünmez (read-your-writes bozulur)
+CACHE_NAMESPACES = os.getenv(
+    "CACHE_NAMESPACES",
+    f"ai_chunks=86400:{SUMMARY_CHUNK_CACHE_SIZE}:50000,"
+    f"idempotency={IDEMPOTENCY_TTL_SECONDS:g}:{IDEMPOTENCY_CACHE_SIZE}:100000"
+)
+# Diğer worker'ların invalidation mesajları en geç bu aralıkla L1'e uygulanır
+CACHE_INVALIDATION_POLL_SECONDS = float(os.getenv("CACHE_INVALIDATION_POLL_SECONDS", "0.5"))
+# Aynı anahtarı yükleyen başka bir worker'ın sonucu en fazla bu kadar beklenir (stampede koruması)
+CACHE_LEASE_SECONDS = float(os.getenv("CACHE_LEASE_SECONDS", "10"))
+
 # Gerekli environment variable'ları kontrol et
 required_vars = [
     "FIREBASE_PROJECT_ID",
@@ -37,6 +179,9 @@ required_vars = [
     "FIREBASE_CLIENT_ID",
     "GEMINI_API_KEY"
 ]
+# Çevrimdışı stand-in API anahtarı kullanmaz
+if AI_BACKEND == "replay":
+    required_vars.remove("GEMINI_API_KEY")
 
 missing_vars = [var for var in required_vars if not os.getenv(var)]
 if missing_vars:
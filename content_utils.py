@@ -0,0 +1,73 @@
+import hashlib
+import re
+from typing import List
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def content_hash(text: str) -> str:
+    """Stable hash of note content, used to detect real content changes"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split content on blank lines; whitespace-only paragraphs are dropped"""
+    return [p.strip() for p in _PARAGRAPH_BREAK.split(text) if p.strip()]
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences (or lines) of text, stripped; empty ones are dropped"""
+    return [s.strip() for s in _SENTENCE_END.split(text) if s.strip()]
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    """A sentence longer than max_chars, split on whitespace"""
+    pieces = []
+    while len(sentence) > max_chars:
+        cut = sentence.rfind(" ", 0, max_chars)
+        cut = cut if cut > 0 else max_chars
+        pieces.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    return pieces + [sentence] if sentence else pieces
+
+
+def split_content_chunks(text: str, max_chars: int) -> List[str]:
+    """
+    Pack whole sentences into chunks of at most max_chars, cut at
+    content-defined points: paragraph ends and sentences picked by their
+    hash. A piece shorter than max_chars / 4 is joined with the next one.
+    Every cut depends only on the text next to it, not on its offset, so an
+    edit changes the chunks around it and the others keep their hashes.
+    """
+    min_chars = max_chars // 4
+    # ~80 karakterlik cümlelerle bir paragraf içinde ortalama max_chars / 2'de bir kesim
+    cut_every = max(2, max_chars // 160)
+    pieces = []
+    for paragraph in split_paragraphs(text):
+        current = ""
+        for sentence in split_sentences(paragraph):
+            for part in _split_long(sentence, max_chars):
+                if current and len(current) + 1 + len(part) > max_chars:
+                    pieces.append(current)
+                    current = ""
+                current = f"{current} {part}" if current else part
+                if int(content_hash(part)[:8], 16) % cut_every == 0:
+                    pieces.append(current)
+                    current = ""
+        if current:
+            pieces.append(current)
+    
+    chunks = []
+    previous = None
+    for piece in pieces:
+        # Birleştirme kararı sadece komşu iki parçaya (ve kısa parça zincirine) bağlı
+        if (previous is not None and len(previous) < min_chars
+                and len(chunks[-1]) + 1 + len(piece) <= max_chars):
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+        previous = piece
+    return chunks
@@ -1,6 +1,6 @@
-import firebase_admin
-from firebase_admin import credentials, firestore, auth
-import json
+import asyncio
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from config import (
     FIREBASE_PROJECT_ID,
     FIREBASE_PRIVATE_KEY_ID,
@@ -8,11 +8,22 @@ from config import (
     FIREBASE_CLIENT_EMAIL,
     FIREBASE_CLIENT_ID,
     FIREBASE_AUTH_URI,
-    FIREBASE_TOKEN_URI
+    FIREBASE_TOKEN_URI,
+    FIRESTORE_CHANNEL_POOL_SIZE,
+    FIRESTORE_MAX_CONCURRENCY
 )
 
+_db_pool = None
+_db_cycle = None
+_db_executor = None
+
 def initialize_firebase():
-    """Initialize Firebase Admin SDK"""
+    """Initialize Firebase Admin SDK and return the pool of Firestore clients"""
+    # Ağır SDK import'ları ilk kullanıma kadar ertelenir
+    import firebase_admin
+    from firebase_admin import credentials
+    from firestore_pool import create_client_pool
+
     if not firebase_admin._apps:
         # Create credentials dictionary
         cred_dict = {
@@ -34,8 +45,34 @@ def initialize_firebase():
         # Initialize Firebase Admin
         firebase_admin.initialize_app(cred)
     
-    # Create Firestore client
-    return firestore.client()
+    # Create Firestore clients (her biri kendi gRPC kanalıyla)
+    app = firebase_admin.get_app()
+    return create_client_pool(
+        app.credential.get_credential(),
+        app.project_id or FIREBASE_PROJECT_ID,
+        FIRESTORE_CHANNEL_POOL_SIZE
+    )
+
+def get_db_pool():
+    """All pooled Firestore clients, initializing Firebase on first use"""
+    global _db_pool, _db_cycle
+    if _db_pool is None:
+        _db_pool = initialize_firebase()
+        _db_cycle = itertools.cycle(_db_pool)
+    return _db_pool
+
+def get_db():
+    """Return the next Firestore client from the pool (round-robin)"""
+    if _db_cycle is None:
+        get_db_pool()
+    return next(_db_cycle)
 
-# Initialize Firestore
-db = initialize_firebase()
+async def run_db(func, *args):
+    """
+    Run a blocking Firestore call in the dedicated Firestore thread pool so the
+    event loop keeps serving other requests while it waits on gRPC.
+    """
+    global _db_executor
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(max_workers=FIRESTORE_MAX_CONCURRENCY, thread_name_prefix="firestore")
+    return await asyncio.get_running_loop().run_in_executor(_db_executor, func, *args)
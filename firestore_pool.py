@@ -0,0 +1,116 @@
+"""Pooled Firestore clients with explicit deadlines, retries and keepalive"""
+# Her istemcinin kendi gRPC kanalı var (yerel subchannel pool); get_db() round-robin dağıtır
+from typing import List
+
+import grpc
+from google.api_core import exceptions as core_exceptions
+from google.api_core import gapic_v1, retry as retries
+from google.cloud import firestore
+from google.cloud.firestore_v1.services.firestore import client as firestore_client
+from google.cloud.firestore_v1.services.firestore.transports.grpc import FirestoreGrpcTransport
+
+from config import (
+    FIREBASE_TIMEOUT,
+    FIRESTORE_STREAM_TIMEOUT,
+    FIRESTORE_RETRY_INITIAL,
+    FIRESTORE_RETRY_MAXIMUM,
+    FIRESTORE_RETRY_MULTIPLIER,
+    FIRESTORE_RETRY_DEADLINE,
+    FIRESTORE_KEEPALIVE_TIME_MS,
+    FIRESTORE_KEEPALIVE_TIMEOUT_MS,
+    FIRESTORE_KEEPALIVE_PERMIT_WITHOUT_CALLS
+)
+
+
+def _retry(*exception_types) -> retries.Retry:
+    return retries.Retry(
+        initial=FIRESTORE_RETRY_INITIAL,
+        maximum=FIRESTORE_RETRY_MAXIMUM,
+        multiplier=FIRESTORE_RETRY_MULTIPLIER,
+        timeout=FIRESTORE_RETRY_DEADLINE,
+        predicate=retries.if_exception_type(*exception_types)
+    )
+
+
+# Okumalar idempotent: geçici hataların hepsinde tekrar denenir
+READ_RETRY = _retry(
+    core_exceptions.DeadlineExceeded,
+    core_exceptions.InternalServerError,
+    core_exceptions.ResourceExhausted,
+    core_exceptions.ServiceUnavailable
+)
+# Yazmalar sadece isteğin işlenmediği kesin olan hatalarda tekrar denenir
+WRITE_RETRY = _retry(
+    core_exceptions.ResourceExhausted,
+    core_exceptions.ServiceUnavailable
+)
+
+# transport method -> (retry, timeout)
+CALL_POLICIES = {
+    "get_document": (READ_RETRY, FIREBASE_TIMEOUT),
+    "batch_get_documents": (READ_RETRY, FIREBASE_TIMEOUT),  # DocumentReference.get / get_all
+    "begin_transaction": (READ_RETRY, FIREBASE_TIMEOUT),
+    "rollback": (READ_RETRY, FIREBASE_TIMEOUT),
+    "commit": (WRITE_RETRY, FIREBASE_TIMEOUT),
+    "create_document": (WRITE_RETRY, FIREBASE_TIMEOUT),
+    "update_document": (WRITE_RETRY, FIREBASE_TIMEOUT),
+    "delete_document": (WRITE_RETRY, FIREBASE_TIMEOUT),
+    "batch_write": (WRITE_RETRY, FIREBASE_TIMEOUT),
+    "run_query": (READ_RETRY, FIRESTORE_STREAM_TIMEOUT),
+    "run_aggregation_query": (READ_RETRY, FIRESTORE_STREAM_TIMEOUT),
+    "partition_query": (READ_RETRY, FIRESTORE_STREAM_TIMEOUT),
+    "list_documents": (READ_RETRY, FIRESTORE_STREAM_TIMEOUT),
+    "list_collection_ids": (READ_RETRY, FIRESTORE_STREAM_TIMEOUT),
+}
+
+
+def channel_options() -> list:
+    return [
+        ("grpc.keepalive_time_ms", FIRESTORE_KEEPALIVE_TIME_MS),
+        ("grpc.keepalive_timeout_ms", FIRESTORE_KEEPALIVE_TIMEOUT_MS),
+        ("grpc.keepalive_permit_without_calls", int(FIRESTORE_KEEPALIVE_PERMIT_WITHOUT_CALLS)),
+        # Aynı hedefe açılan kanallar ayrı TCP bağlantısı kullansın
+        ("grpc.use_local_subchannel_pool", 1),
+    ]
+
+
+class TunedFirestoreTransport(FirestoreGrpcTransport):
+    def _prep_wrapped_messages(self, client_info):
+        super()._prep_wrapped_messages(client_info)
+        for name, (retry, timeout) in CALL_POLICIES.items():
+            method = getattr(self, name)
+            self._wrapped_methods[method] = gapic_v1.method.wrap_method(
+                method,
+                default_retry=retry,
+                default_timeout=timeout,
+                client_info=client_info
+            )
+
+
+class TunedFirestoreClient(firestore.Client):
+    """firestore.Client with its own channel, keepalive settings and call policies"""
+
+    @property
+    def _firestore_api(self):
+        if self._firestore_api_internal is None:
+            if self._emulator_host is not None:
+                channel = grpc.insecure_channel(
+                    self._emulator_host,
+                    options=channel_options() + [("Authorization", "Bearer owner")]
+                )
+            else:
+                channel = TunedFirestoreTransport.create_channel(
+                    self._target,
+                    credentials=self._credentials,
+                    options=channel_options()
+                )
+            self._transport = TunedFirestoreTransport(host=self._target, channel=channel)
+            self._firestore_api_internal = firestore_client.FirestoreClient(
+                transport=self._transport, client_options=self._client_options
+            )
+            firestore_client._client_info = self._client_info
+        return self._firestore_api_internal
+
+
+def create_client_pool(credentials, project: str, size: int) -> List[TunedFirestoreClient]:
+    return [TunedFirestoreClient(project=project, credentials=credentials) for _ in range(max(1, size))]
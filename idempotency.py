@@ -0,0 +1,10 @@
+import uuid
+
+# Idempotency-Key -> note ID eşlemesi için sabit namespace
+_NOTE_ID_NAMESPACE = uuid.UUID("6f1c3e2a-9b7d-4c55-8e0f-2a41d7b3c9e8")
+
+
+def note_id_for_key(owner_uid: str, idempotency_key: str) -> str:
+    """Deterministic note ID for an Idempotency-Key, so retries hit the same document on any worker"""
+    return str(uuid.uuid5(_NOTE_ID_NAMESPACE, f"{owner_uid}:{idempotency_key}"))
+
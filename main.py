@@ -1,14 +1,71 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from routes.notes import router as notes_router
-from config import HOST, PORT, DEBUG
+from routes.notes import router as notes_router, change_hub
+from firebase_config import get_db_pool
+from ai_service import get_ai_service
+from warmup import warm_up
+from compression import CompressionMiddleware
+from compaction import compaction_loop
+from note_stats import stats_reconcile_loop
+from token_usage import token_usage
+from cache import cache
+from config import (
+    HOST,
+    PORT,
+    DEBUG,
+    KEEP_ALIVE_TIMEOUT,
+    GRACEFUL_SHUTDOWN_TIMEOUT,
+    WARMUP_ON_STARTUP,
+    WARMUP_TIMEOUT,
+    COMPRESSION_ENABLED,
+    COMPACTION_INTERVAL_HOURS,
+    STATS_RECONCILE_INTERVAL_HOURS
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize Firebase and the shared AI service once per worker"""
+    started = time.perf_counter()
+    get_db_pool()
+    try:
+        get_ai_service()
+    except ValueError as e:
+        print(f"AI servisi başlatılamadı: {str(e)}")
+    init_seconds = time.perf_counter() - started
+
+    warmup_timings = {}
+    if WARMUP_ON_STARTUP:
+        warmup_timings = await warm_up(WARMUP_TIMEOUT)
+
+    app.state.startup_seconds = time.perf_counter() - started
+    print(
+        f"Startup complete in {app.state.startup_seconds:.3f}s "
+        f"(init {init_seconds:.3f}s, warm-up {warmup_timings})"
+    )
+    change_hub.start()
+    compaction_task = None
+    if COMPACTION_INTERVAL_HOURS > 0:
+        compaction_task = asyncio.create_task(compaction_loop(COMPACTION_INTERVAL_HOURS))
+    stats_task = None
+    if STATS_RECONCILE_INTERVAL_HOURS > 0:
+        stats_task = asyncio.create_task(stats_reconcile_loop(STATS_RECONCILE_INTERVAL_HOURS))
+    yield
+    if compaction_task is not None:
+        compaction_task.cancel()
+    if stats_task is not None:
+        stats_task.cancel()
+    await change_hub.close()
 
 # Create FastAPI app
 app = FastAPI(
     title="Connectinno Notes API",
     description="A FastAPI backend for the Connectinno Notes app",
     version="1.0.0",
-    debug=DEBUG
+    debug=DEBUG,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -18,8 +75,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "RateLimit-Policy", "Retry-After"],
 )
 
+# Negotiated response compression (gzip/br/zstd) for large note lists
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
 # Include routers
 app.include_router(notes_router)
 
@@ -33,6 +95,20 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "API is running"}
 
+@app.get("/health/ai-usage")
+async def ai_usage():
+    """Gemini token usage per endpoint and prompt, and model routing state, for this worker"""
+    try:
+        routing = get_ai_service().router.status()
+    except ValueError:
+        routing = []
+    return {"usage": token_usage.snapshot(), "routing": routing}
+
+@app.get("/health/cache")
+async def cache_status():
+    """Per-namespace hit/miss counters and L1 sizes of the shared cache, for this worker"""
+    return cache.status()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -40,6 +116,6 @@ if __name__ == "__main__":
         host=HOST,
         port=PORT,
         reload=DEBUG,
-        timeout_keep_alive=30,
-        timeout_graceful_shutdown=10
+        timeout_keep_alive=KEEP_ALIVE_TIMEOUT,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT
     )
@@ -0,0 +1,227 @@
+"""Model clients behind AIService, selected with AI_BACKEND (gemini / record / replay)"""
+import json
+import math
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from config import (
+    GEMINI_API_KEY,
+    AI_BACKEND,
+    AI_RECORDINGS_PATH,
+    AI_STANDIN_LATENCY_MEDIAN,
+    AI_STANDIN_LATENCY_SIGMA,
+    AI_STANDIN_LATENCY_SCALE,
+    AI_STANDIN_ERROR_RATE,
+    AI_STANDIN_HANG_RATE,
+    AI_STANDIN_HANG_SECONDS,
+    AI_STANDIN_SEED
+)
+from content_utils import content_hash
+from prompts import estimate_tokens
+
+BACKENDS = ("gemini", "record", "replay")
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "corpus", "gemini_responses.jsonl")
+
+
+def response_kind(generation_config: Optional[dict]) -> str:
+    """summary / todos for JSON-mode calls (by schema), text otherwise"""
+    properties = ((generation_config or {}).get("response_schema") or {}).get("properties", {})
+    if "todos" in properties:
+        return "todos"
+    if "summary" in properties:
+        return "summary"
+    return "text"
+
+
+class UsageMetadata(NamedTuple):
+    prompt_token_count: int
+    candidates_token_count: int
+
+
+class CountTokensResponse(NamedTuple):
+    total_tokens: int
+
+
+class StandinResponse:
+    """The parts of GenerateContentResponse that AIService reads"""
+
+    def __init__(self, text: str, usage_metadata: Optional[UsageMetadata] = None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+def load_recordings(path: str) -> Dict[str, dict]:
+    """prompt hash -> last recorded answer (missing file = no recordings)"""
+    recordings: Dict[str, dict] = {}
+    if not path or not os.path.exists(path):
+        return recordings
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                recordings[record["key"]] = record
+    return recordings
+
+
+def load_corpus_samples(path: str = CORPUS_PATH) -> Dict[str, List[str]]:
+    """kind -> sample answers; JSON-mode kinds only get JSON samples, text gets plain summaries"""
+    samples: Dict[str, List[str]] = {"summary": [], "todos": [], "text": []}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            sample = json.loads(line)
+            if sample["format"] == "json":
+                samples[sample["kind"]].append(sample["response"])
+            if sample["kind"] == "summary" and sample["expected"]["summary"]:
+                samples["text"].append(sample["expected"]["summary"])
+    return samples
+
+
+class RecordingModel:
+    """Live model that appends every answered prompt to a JSONL recording"""
+
+    _write_lock = threading.Lock()
+
+    def __init__(self, model, model_name: str, path: str = AI_RECORDINGS_PATH):
+        self._model = model
+        self.model_name = model_name
+        self.path = path
+
+    def generate_content(self, prompt: str, generation_config: Optional[dict] = None, **kwargs):
+        started = time.monotonic()
+        response = self._model.generate_content(prompt, generation_config=generation_config, **kwargs)
+        latency = time.monotonic() - started
+        usage = getattr(response, "usage_metadata", None)
+        record = {
+            "key": content_hash(prompt),
+            "model": self.model_name,
+            "kind": response_kind(generation_config),
+            "response": response.text,
+            "latency": round(latency, 3),
+            "promptTokens": getattr(usage, "prompt_token_count", 0) or 0,
+            "outputTokens": getattr(usage, "candidates_token_count", 0) or 0
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._write_lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        return response
+
+    def count_tokens(self, contents, **kwargs):
+        return self._model.count_tokens(contents, **kwargs)
+
+
+class ReplayModel:
+    """Offline stand-in for one model name (see docs/ai-features.md, Offline Stand-in)"""
+
+    def __init__(
+        self,
+        model_name: str,
+        recordings: Dict[str, dict],
+        samples: Dict[str, List[str]],
+        seed: str = AI_STANDIN_SEED
+    ):
+        self.model_name = model_name
+        self._recordings = recordings
+        self._samples = samples
+        self._seed = seed
+        # prompt hash -> kaç kez görüldü (tekrarlar farklı ama deterministik çekilişler alır)
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "recorded": 0, "sampled": 0, "errors": 0, "hangs": 0}
+
+    def _rng(self, key: str) -> random.Random:
+        with self._lock:
+            occurrence = self._seen.get(key, 0)
+            self._seen[key] = occurrence + 1
+            self.stats["calls"] += 1
+        return random.Random(f"{self._seed}:{self.model_name}:{key}:{occurrence}")
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _answer(self, key: str, kind: str, rng: random.Random):
+        """(text, recorded latency or None, usage)"""
+        record = self._recordings.get(key)
+        if record is not None:
+            self._count("recorded")
+            return record["response"], record.get("latency"), record.get("outputTokens") or None
+        self._count("sampled")
+        candidates = self._samples.get(kind) or self._samples["text"]
+        return rng.choice(candidates), None, None
+
+    def _latency(self, recorded: Optional[float], rng: random.Random) -> float:
+        if recorded is None:
+            recorded = AI_STANDIN_LATENCY_MEDIAN * math.exp(rng.gauss(0.0, AI_STANDIN_LATENCY_SIGMA))
+        return recorded * AI_STANDIN_LATENCY_SCALE
+
+    def _maybe_fail(self, latency: float, rng: random.Random):
+        """Inject a hang (sleeps past any route timeout) or an API error"""
+        roll = rng.random()
+        if roll < AI_STANDIN_HANG_RATE:
+            self._count("hangs")
+            time.sleep(AI_STANDIN_HANG_SECONDS)
+            raise self._error(rng, hang=True)
+        if roll < AI_STANDIN_HANG_RATE + AI_STANDIN_ERROR_RATE:
+            self._count("errors")
+            # Hatalar genelde başarılı bir yanıttan önce döner
+            time.sleep(latency * rng.uniform(0.1, 0.5))
+            raise self._error(rng)
+
+    @staticmethod
+    def _error(rng: random.Random, hang: bool = False) -> Exception:
+        from google.api_core import exceptions as core_exceptions
+
+        if hang:
+            return core_exceptions.DeadlineExceeded("504 Deadline Exceeded (stand-in hang)")
+        return rng.choice([
+            core_exceptions.ResourceExhausted("429 Resource has been exhausted (stand-in)"),
+            core_exceptions.InternalServerError("500 An internal error has occurred (stand-in)"),
+            core_exceptions.ServiceUnavailable("503 The service is currently unavailable (stand-in)")
+        ])
+
+    def generate_content(self, prompt: str, generation_config: Optional[dict] = None, **kwargs):
+        key = content_hash(prompt)
+        rng = self._rng(key)
+        text, recorded_latency, output_tokens = self._answer(key, response_kind(generation_config), rng)
+        latency = self._latency(recorded_latency, rng)
+        self._maybe_fail(latency, rng)
+
+        usage = UsageMetadata(estimate_tokens(prompt), output_tokens or estimate_tokens(text))
+        time.sleep(latency)
+        return StandinResponse(text, usage)
+
+    def count_tokens(self, contents, **kwargs) -> CountTokensResponse:
+        return CountTokensResponse(estimate_tokens(str(contents)))
+
+
+def create_model_factory(backend: str = AI_BACKEND) -> Callable[[str], object]:
+    """
+    Model name -> client factory for ModelPool. The gemini and record
+    backends raise ValueError when GEMINI_API_KEY is missing.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown AI_BACKEND {backend!r} (expected one of {', '.join(BACKENDS)})")
+
+    if backend == "replay":
+        recordings = load_recordings(AI_RECORDINGS_PATH)
+        samples = load_corpus_samples()
+        print(f"AI backend: offline replay ({len(recordings)} recorded prompts)")
+        return lambda model_name: ReplayModel(model_name, recordings, samples)
+
+    if not GEMINI_API_KEY or GEMINI_API_KEY == "YOUR_GEMINI_API_KEY_HERE":
+        raise ValueError("GEMINI_API_KEY is not set in environment variables")
+
+    # google.generativeai import'u ağır, sadece canlı istemci gerektiğinde yüklenir
+    import google.generativeai as genai
+
+    genai.configure(api_key=GEMINI_API_KEY)
+    if backend == "record":
+        print(f"AI backend: live Gemini, recording to {AI_RECORDINGS_PATH}")
+        return lambda model_name: RecordingModel(genai.GenerativeModel(model_name), model_name)
+    return genai.GenerativeModel
@@ -0,0 +1,162 @@
+"""Per-call model selection for AIService: routing rules, latency SLOs and tier downgrades"""
+import json
+import re
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from config import (
+    AI_MODEL_FAST,
+    AI_MODEL_STANDARD,
+    AI_MODEL_STRONG,
+    AI_ROUTING_RULES,
+    AI_LATENCY_SLOS,
+    AI_DOWNGRADE_SECONDS
+)
+from content_utils import split_sentences
+
+TIERS = ("local", "fast", "standard", "strong")
+DEFAULT_TIER = "standard"
+_EWMA_ALPHA = 0.3
+
+
+def parse_rules(spec: str) -> Dict[str, List[Tuple[int, str]]]:
+    """"summary:0=fast,summary:1500=standard" -> {"summary": [(1500, "standard"), (0, "fast")]}"""
+    rules: Dict[str, List[Tuple[int, str]]] = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        target, _, tier = part.partition("=")
+        prompt_name, _, min_chars = target.partition(":")
+        tier = tier.strip()
+        if tier not in TIERS:
+            raise ValueError(f"Unknown model tier in AI_ROUTING_RULES: {tier!r}")
+        rules.setdefault(prompt_name.strip(), []).append((int(min_chars or 0), tier))
+    for prompt_rules in rules.values():
+        prompt_rules.sort(reverse=True)
+    return rules
+
+
+def parse_slos(spec: str) -> Dict[str, float]:
+    """"summary=6,todos=4" -> {"summary": 6.0, "todos": 4.0}"""
+    slos = {}
+    for part in spec.split(","):
+        prompt_name, _, seconds = part.partition("=")
+        if prompt_name.strip() and seconds.strip():
+            slos[prompt_name.strip()] = float(seconds)
+    return slos
+
+
+class ModelPool:
+    """One model handle per model name, created on first use and shared by all calls"""
+
+    def __init__(self, factory: Callable[[str], object]):
+        self._factory = factory
+        self._models: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str):
+        model = self._models.get(model_name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(model_name)
+                if model is None:
+                    model = self._models[model_name] = self._factory(model_name)
+        return model
+
+    def created(self) -> Dict[str, object]:
+        """Handles created so far, by model name"""
+        return dict(self._models)
+
+
+class Route(NamedTuple):
+    tier: str
+    model_name: Optional[str]  # None for the local tier
+    downgraded: bool
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        rules: str = AI_ROUTING_RULES,
+        slos: str = AI_LATENCY_SLOS,
+        downgrade_seconds: float = AI_DOWNGRADE_SECONDS
+    ):
+        self.rules = parse_rules(rules)
+        self.slos = parse_slos(slos)
+        self.downgrade_seconds = downgrade_seconds
+        self.model_names = {"fast": AI_MODEL_FAST, "standard": AI_MODEL_STANDARD, "strong": AI_MODEL_STRONG}
+        # (prompt, tier) -> gecikme ortalaması (saniye) / düşürülme bitiş zamanı
+        self._latency: Dict[Tuple[str, str], float] = {}
+        self._downgraded_until: Dict[Tuple[str, str], float] = {}
+
+    def primary_tier(self, prompt_name: str, body_chars: int) -> str:
+        for min_chars, tier in self.rules.get(prompt_name, ()):
+            if body_chars >= min_chars:
+                return tier
+        return DEFAULT_TIER
+
+    def route(self, prompt_name: str, body_chars: int) -> Route:
+        primary = self.primary_tier(prompt_name, body_chars)
+        tier = primary
+        now = time.monotonic()
+        # SLO'yu aşan tier'lar geçici olarak atlanır; fast'in altına inilmez
+        while tier not in ("local", "fast") and self._downgraded_until.get((prompt_name, tier), 0.0) > now:
+            tier = TIERS[TIERS.index(tier) - 1]
+        return Route(tier, self.model_names.get(tier), tier != primary)
+
+    def observe(self, prompt_name: str, tier: str, seconds: float, failed: bool = False):
+        """Record a finished call; downgrade the tier if it is over its SLO or failing"""
+        if tier == "local":
+            return
+        key = (prompt_name, tier)
+        previous = self._latency.get(key)
+        latency = seconds if previous is None else previous + _EWMA_ALPHA * (seconds - previous)
+        self._latency[key] = latency
+
+        slo = self.slos.get(prompt_name)
+        if tier != "fast" and (failed or (slo is not None and latency > slo)):
+            now = time.monotonic()
+            if self._downgraded_until.get(key, 0.0) <= now:
+                reason = "failing" if failed else f"{latency:.2f}s > SLO {slo}s"
+                print(f"Model routing: downgrading {prompt_name}/{tier} for {self.downgrade_seconds:.0f}s ({reason})")
+            self._downgraded_until[key] = now + self.downgrade_seconds
+            # Süre dolunca tier yeni ölçümlerle değerlendirilsin
+            self._latency.pop(key, None)
+
+    def status(self) -> List[dict]:
+        now = time.monotonic()
+        keys = set(self._latency) | {key for key, until in self._downgraded_until.items() if until > now}
+        return [
+            {
+                "prompt": prompt_name,
+                "tier": tier,
+                "model": self.model_names.get(tier),
+                "latencySeconds": round(self._latency[(prompt_name, tier)], 3) if (prompt_name, tier) in self._latency else None,
+                "sloSeconds": self.slos.get(prompt_name),
+                "downgradedForSeconds": max(0.0, round(self._downgraded_until.get((prompt_name, tier), 0.0) - now, 1))
+            }
+            for prompt_name, tier in sorted(keys)
+        ]
+
+
+# Local tier: no model call, answers in the same format the parsers expect
+_CHECKLIST_ITEM = re.compile(r"\s*(?:[-*•]\s*)?(?:\[ \]|☐|TODO\s*:|Yapılacak\s*:)\s*(.+)", re.IGNORECASE)
+
+
+def local_generate(prompt_name: str, body: str) -> str:
+    if prompt_name == "todos":
+        todos = []
+        for line in body.splitlines():
+            match = _CHECKLIST_ITEM.match(line)
+            if match and match.group(1).strip():
+                todos.append(match.group(1).strip())
+        return json.dumps({"todos": todos}, ensure_ascii=False)
+
+    # summary_reduce gövdesi "- kısmi özet" satırlarından oluşur
+    sentences = [sentence.lstrip("-•* ") for sentence in split_sentences(body)]
+    summary = " ".join(sentences[:2])
+    if prompt_name == "summary_chunk":
+        return summary
+    return json.dumps({"summary": summary, "keyPoints": sentences[2:7]}, ensure_ascii=False)
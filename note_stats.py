@@ -0,0 +1,158 @@
+"""
+Per-user note statistics (user_stats/{uid}) and their reconciliation.
+
+    python note_stats.py [--uid <uid>] [--dry-run]
+"""
+import argparse
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from firebase_config import get_db
+from config import STATS_RECONCILE_INTERVAL_HOURS
+
+STATS_COLLECTION = "user_stats"
+STAT_FIELDS = ("total_notes", "notes_with_todos", "open_todos")
+_SCAN_PAGE_SIZE = 500
+
+StatsDelta = Tuple[int, int, int]
+
+
+def note_contribution(note: Optional[dict]) -> StatsDelta:
+    """What one note adds to its owner's counters"""
+    if not note or note.get("deleted", False):
+        return 0, 0, 0
+    todos = note.get("todos") or []
+    return 1, 1 if todos else 0, len(todos)
+
+
+def stats_delta(before: Optional[dict], after: Optional[dict]) -> StatsDelta:
+    old = note_contribution(before)
+    new = note_contribution(after)
+    return new[0] - old[0], new[1] - old[1], new[2] - old[2]
+
+
+def stats_ref(db, owner_uid: str):
+    return db.collection(STATS_COLLECTION).document(owner_uid)
+
+
+def add_stats_increment(batch, db, owner_uid: str, delta: StatsDelta):
+    """Queue the counter change on batch (or transaction); no-op when nothing changed"""
+    if not any(delta):
+        return
+    from google.cloud import firestore
+
+    update = {field: firestore.Increment(value) for field, value in zip(STAT_FIELDS, delta) if value}
+    update["owner_uid"] = owner_uid
+    update["updated_at"] = firestore.SERVER_TIMESTAMP
+    batch.set(stats_ref(db, owner_uid), update, merge=True)
+
+
+def count_user_notes(db, owner_uid: str, transaction=None) -> Dict[str, int]:
+    query = (db.collection("notes")
+             .where("owner_uid", "==", owner_uid)
+             .where("deleted", "==", False)
+             .select(["todos"]))
+    totals = [0, 0, 0]
+    for doc in query.stream(transaction=transaction):
+        for i, value in enumerate(note_contribution(doc.to_dict())):
+            totals[i] += value
+    return dict(zip(STAT_FIELDS, totals))
+
+
+def reconcile_user_stats(owner_uid: str) -> Dict[str, int]:
+    """Recount one user's notes and overwrite the aggregate in a single transaction"""
+    from google.cloud import firestore
+
+    db = get_db()
+
+    @firestore.transactional
+    def recount(transaction):
+        stats = count_user_notes(db, owner_uid, transaction)
+        transaction.set(stats_ref(db, owner_uid), {
+            **stats,
+            "owner_uid": owner_uid,
+            "updated_at": firestore.SERVER_TIMESTAMP,
+            "reconciled_at": firestore.SERVER_TIMESTAMP
+        })
+        return stats
+
+    return recount(db.transaction())
+
+
+def _expected_stats(db) -> Dict[str, list]:
+    """One paged pass over all notes: uid -> [total, with todos, open todos]"""
+    from google.cloud.firestore_v1.field_path import FieldPath
+
+    query = (db.collection("notes")
+             .select(["owner_uid", "deleted", "todos"])
+             .order_by(FieldPath.document_id())
+             .limit(_SCAN_PAGE_SIZE))
+    expected: Dict[str, list] = {}
+    last_doc = None
+    while True:
+        page = query.start_after(last_doc) if last_doc is not None else query
+        docs = list(page.stream())
+        for doc in docs:
+            note = doc.to_dict()
+            totals = expected.setdefault(note.get("owner_uid"), [0, 0, 0])
+            for i, value in enumerate(note_contribution(note)):
+                totals[i] += value
+        if len(docs) < _SCAN_PAGE_SIZE:
+            break
+        last_doc = docs[-1]
+    return expected
+
+
+def reconcile_all_stats(dry_run: bool = False) -> dict:
+    """
+    Compare every aggregate with a full recount; users whose counters drifted
+    (or have no reconciled aggregate yet) are recounted exactly with
+    reconcile_user_stats.
+    """
+    db = get_db()
+    expected = _expected_stats(db)
+    # Hiç sayılmamış dokümanlar değerleri tutsa bile yeniden sayılır (reconciled_at yazılır)
+    actual = {
+        doc.id: [doc.to_dict().get(field, 0) for field in STAT_FIELDS]
+        for doc in db.collection(STATS_COLLECTION).stream()
+        if "reconciled_at" in doc.to_dict()
+    }
+
+    drifted = [
+        uid for uid in set(expected) | set(actual)
+        if uid and expected.get(uid, [0, 0, 0]) != actual.get(uid)
+    ]
+    if not dry_run:
+        for uid in drifted:
+            reconcile_user_stats(uid)
+
+    report = {"users": len(expected), "drifted": len(drifted), "dry_run": dry_run}
+    print(f"Stats reconciliation {'(dry run) ' if dry_run else ''}done: {len(drifted)} of {len(expected)} users drifted")
+    return report
+
+
+async def stats_reconcile_loop(interval_hours: float = STATS_RECONCILE_INTERVAL_HOURS):
+    """In-app scheduler: reconcile every interval_hours (started from main.lifespan)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, reconcile_all_stats)
+        except Exception as e:
+            print(f"Stats reconciliation error: {e}")
+        await asyncio.sleep(interval_hours * 3600)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Repair drift in per-user note statistics")
+    parser.add_argument("--uid", help="Reconcile a single user")
+    parser.add_argument("--dry-run", action="store_true", help="Only report drifted users")
+    args = parser.parse_args()
+
+    if args.uid:
+        print(reconcile_user_stats(args.uid))
+    else:
+        reconcile_all_stats(dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
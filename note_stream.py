@@ -0,0 +1,165 @@
+import asyncio
+from typing import Dict, Optional, Set
+
+from schemas import NoteResponse
+from repository import NotesRepository
+from config import STREAM_MAX_FEEDS, STREAM_IDLE_TIMEOUT, STREAM_QUEUE_SIZE
+
+
+class FeedLimitError(Exception):
+    """Raised when this worker already holds STREAM_MAX_FEEDS Firestore listeners"""
+
+
+def _serialize_change(change) -> dict:
+    """Turn a Firestore DocumentChange into a stream event"""
+    kind = change.type.name.lower()  # added / modified / removed
+    if kind == "removed":
+        # Silinen (soft delete) notlar da sorgudan çıktığı için "removed" olarak gelir
+        return {"type": kind, "data": {"id": change.document.id}}
+    note = NoteResponse(**change.document.to_dict())
+    return {"type": kind, "data": note.model_dump(mode="json", by_alias=True)}
+
+
+class _UserFeed:
+    """One Firestore listener for a user, fanned out to every subscriber queue"""
+
+    def __init__(self, owner_uid: str, loop: asyncio.AbstractEventLoop):
+        self.owner_uid = owner_uid
+        self.loop = loop
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.watch = None
+        self.ready = False
+        # Listener açılışı bitince set edilir; açılamadıysa start_error dolu olur
+        self.started = asyncio.Event()
+        self.start_error: Optional[BaseException] = None
+        # Sadece listener thread'inde okunup yazılır (ready ise loop'ta)
+        self._first_snapshot_seen = False
+        self.idle_since: Optional[float] = None
+
+    def on_snapshot(self, docs, changes, read_time):
+        # Firestore'un listener thread'inde çalışır
+        if not self._first_snapshot_seen:
+            # The first snapshot is the full result set; clients already have it from GET /api/notes
+            self._first_snapshot_seen = True
+            self.loop.call_soon_threadsafe(self._mark_ready)
+            return
+        events = []
+        for change in changes:
+            try:
+                events.append(_serialize_change(change))
+            except Exception as e:
+                print(f"Note stream serialize error: {e}")
+        if events:
+            self.loop.call_soon_threadsafe(self._publish, events)
+
+    def _mark_ready(self):
+        self.ready = True
+        self._publish([{"type": "ready", "data": {}}])
+
+    def _publish(self, events):
+        for queue in list(self.subscribers):
+            try:
+                for event in events:
+                    queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its backlog and tell it to resync from GET /api/notes
+                self.subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                self._touch()
+
+    def _touch(self):
+        if not self.subscribers and self.idle_since is None:
+            self.idle_since = self.loop.time()
+
+
+class NoteChangeHub:
+    """
+    Per-worker registry of user feeds. Each user has at most one Firestore
+    listener no matter how many devices are connected; feeds without
+    subscribers are closed by the reaper after STREAM_IDLE_TIMEOUT seconds.
+    """
+
+    def __init__(self, repository: NotesRepository, max_feeds: int = STREAM_MAX_FEEDS, idle_timeout: float = STREAM_IDLE_TIMEOUT):
+        self.repository = repository
+        self.max_feeds = max_feeds
+        self.idle_timeout = idle_timeout
+        self._feeds: Dict[str, _UserFeed] = {}
+        self._reaper: Optional[asyncio.Task] = None
+
+    async def subscribe(self, owner_uid: str) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        feed = self._feeds.get(owner_uid)
+        if feed is None:
+            if len(self._feeds) >= self.max_feeds:
+                raise FeedLimitError("Too many live note streams on this worker")
+            feed = _UserFeed(owner_uid, loop)
+            self._feeds[owner_uid] = feed
+            try:
+                feed.watch = await loop.run_in_executor(
+                    None, self.repository.watch_owner_notes, owner_uid, feed.on_snapshot
+                )
+            except BaseException as e:
+                # Bu arada bekleyen abonelere de aynı hata iletilir
+                self._feeds.pop(owner_uid, None)
+                feed.start_error = e
+                raise
+            finally:
+                feed.started.set()
+        else:
+            # Listener'ı başka bir istek açıyor olabilir; açılamazsa bu abone de hata alır
+            await feed.started.wait()
+            if feed.start_error is not None:
+                raise RuntimeError("Note stream listener could not be started") from feed.start_error
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        if feed.ready:
+            queue.put_nowait({"type": "ready", "data": {}})
+        feed.subscribers.add(queue)
+        feed.idle_since = None
+        return queue
+
+    def unsubscribe(self, owner_uid: str, queue: asyncio.Queue):
+        feed = self._feeds.get(owner_uid)
+        if feed is not None:
+            feed.subscribers.discard(queue)
+            feed._touch()
+
+    def start(self):
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def _reap_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_timeout / 2))
+            now = loop.time()
+            idle = [
+                uid for uid, feed in self._feeds.items()
+                if not feed.subscribers and feed.idle_since is not None and now - feed.idle_since >= self.idle_timeout
+            ]
+            for uid in idle:
+                feed = self._feeds.get(uid)
+                # Bu arada yeni bir abone bağlanmış olabilir
+                if feed is not None and not feed.subscribers:
+                    await self._close_feed(uid)
+
+    async def _close_feed(self, owner_uid: str):
+        feed = self._feeds.pop(owner_uid, None)
+        if feed is not None and feed.watch is not None:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, feed.watch.unsubscribe)
+            except Exception as e:
+                print(f"Note stream unsubscribe error: {e}")
+
+    async def close(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for uid in list(self._feeds):
+            await self._close_feed(uid)
+
+    @property
+    def feed_count(self) -> int:
+        return len(self._feeds)
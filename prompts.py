@@ -0,0 +1,105 @@
+"""Gemini prompt templates, compacted once at import and rendered within a token budget"""
+import math
+import re
+from string import Template
+from typing import Dict
+
+from config import AI_PROMPT_TOKEN_BUDGET, AI_CHARS_PER_TOKEN
+
+_SPACES = re.compile(r"[ \t]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / AI_CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text at a word boundary so it fits in max_tokens"""
+    max_chars = int(max(max_tokens, 0) * AI_CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars - 3)
+    return text[:cut if cut > 0 else max_chars - 3] + "..."
+
+
+def squeeze_whitespace(text: str) -> str:
+    """Collapse space/tab runs and more than one blank line; keeps paragraph breaks"""
+    text = _SPACES.sub(" ", text.strip())
+    return _BLANK_LINES.sub("\n\n", text.replace(" \n", "\n").replace("\n ", "\n"))
+
+
+def _compact(text: str) -> str:
+    lines = [_SPACES.sub(" ", line.strip()) for line in text.strip().splitlines()]
+    return "\n".join(line for line in lines if line)
+
+
+class PromptTemplate:
+    """A compacted template with one $body field"""
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self._template = Template(_compact(text))
+        # Gövde dışındaki sabit kısmın token maliyeti, bir kez hesaplanır
+        self.overhead_tokens = estimate_tokens(self._template.substitute(body=""))
+
+    def body_token_budget(self, budget: int = AI_PROMPT_TOKEN_BUDGET) -> int:
+        return budget - self.overhead_tokens
+
+    def body_char_budget(self, budget: int = AI_PROMPT_TOKEN_BUDGET) -> int:
+        """Approximate body length (chars) that fits; used to size chunks"""
+        return int(self.body_token_budget(budget) * AI_CHARS_PER_TOKEN)
+
+    def fits(self, body: str, budget: int = AI_PROMPT_TOKEN_BUDGET) -> bool:
+        return estimate_tokens(body) <= self.body_token_budget(budget)
+
+    def render(self, body: str, budget: int = AI_PROMPT_TOKEN_BUDGET) -> str:
+        body = truncate_to_tokens(squeeze_whitespace(body), self.body_token_budget(budget))
+        return self._template.substitute(body=body)
+
+
+PROMPTS: Dict[str, PromptTemplate] = {
+    "summary": PromptTemplate("summary", """
+        Aşağıdaki not içeriğini Türkçe olarak özetleyin ve anahtar noktaları çıkarın.
+
+        İçerik:
+        $body
+
+        Yanıtı JSON olarak verin:
+        - "summary": 2-3 cümlelik kısa özet
+        - "keyPoints": anahtar noktalar listesi (maksimum 5 adet)
+    """),
+    "summary_chunk": PromptTemplate("summary_chunk", """
+        Aşağıdaki metin uzun bir notun bir bölümüdür. Bu bölümü Türkçe olarak
+        2-3 cümleyle özetleyin. Sadece özet metnini yazın.
+
+        Metin:
+        $body
+    """),
+    "summary_reduce": PromptTemplate("summary_reduce", """
+        Aşağıda uzun bir notun bölümlerine ait kısmi özetler var. Bunları birleştirerek
+        notun tamamı için Türkçe bir özet ve anahtar noktalar çıkarın.
+
+        Kısmi özetler:
+        $body
+
+        Yanıtı JSON olarak verin:
+        - "summary": 2-3 cümlelik kısa özet
+        - "keyPoints": anahtar noktalar listesi (maksimum 5 adet)
+    """),
+    "todos": PromptTemplate("todos", """
+        Aşağıdaki metni analiz et ve yapılacak işleri (todo'ları) çıkar.
+
+        Metin:
+        $body
+
+        Yanıtı JSON olarak ver: {"todos": [...]}. Her yapılacak iş listede
+        ayrı bir eleman olsun; yapılacak iş yoksa liste boş olsun.
+
+        Örnek:
+        "Yarın sunum dosyasını tamamla ve Ali'ye gönder"
+        {"todos": ["Sunum dosyasını tamamla", "Ali'ye gönder"]}
+
+        Sadece yapılacak işleri çıkar, geçmiş olayları değil.
+    """),
+}
@@ -0,0 +1,275 @@
+import asyncio
+import math
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response, status
+
+from auth import get_current_user
+from config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_WORKERS,
+    RATE_LIMIT_SQLITE_PATH,
+    RATE_LIMIT_REDIS_URL,
+    RATE_LIMIT_CRUD_PER_MINUTE,
+    RATE_LIMIT_AI_PER_MINUTE
+)
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: int
+    reset_after: float  # seconds until the bucket is full again
+    retry_after: float  # seconds until the next request is allowed (0 if allowed)
+
+
+class InMemoryRateLimitBackend:
+    """Token buckets in a dict; limits are per worker process"""
+
+    per_worker = True
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> (tokens, last refill time, capacity, refill per second)
+        self._buckets: Dict[str, Tuple[float, float, float, float]] = {}
+
+    async def consume(self, key: str, capacity: int, refill_per_second: float, cost: int = 1) -> RateLimitResult:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = float(capacity)
+        else:
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * refill_per_second)
+
+        if tokens >= cost:
+            tokens -= cost
+            retry_after = 0.0
+        else:
+            retry_after = (cost - tokens) / refill_per_second
+
+        self._buckets[key] = (tokens, now, capacity, refill_per_second)
+        if len(self._buckets) > self.max_keys:
+            self._prune(now)
+
+        return RateLimitResult(
+            allowed=retry_after == 0.0,
+            remaining=int(tokens),
+            reset_after=(capacity - tokens) / refill_per_second,
+            retry_after=retry_after
+        )
+
+    def _prune(self, now: float):
+        """Drop buckets that have refilled completely; they carry no state"""
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if bucket[0] + (now - bucket[1]) * bucket[3] < bucket[2]
+        }
+
+
+class SQLiteRateLimitBackend:
+    """
+    Token buckets in a SQLite file shared by the workers of one host. Every
+    call takes the file's write lock, so it serializes the host's workers.
+    """
+
+    _PRUNE_EVERY = 1000  # dolu bucket'lar her N çağrıda bir silinir
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._calls = 0
+        # sqlite3 bağlantısı tek bir thread'den kullanılır
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ratelimit")
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, ts REAL NOT NULL, full_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _consume(self, key: str, capacity: int, refill_per_second: float, cost: int) -> RateLimitResult:
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            # Süreçler arası ortak saat olarak duvar saati kullanılır
+            now = time.time()
+            row = db.execute("SELECT tokens, ts FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = float(capacity) if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * refill_per_second)
+            if tokens >= cost:
+                tokens -= cost
+                retry_after = 0.0
+            else:
+                retry_after = (cost - tokens) / refill_per_second
+            reset_after = (capacity - tokens) / refill_per_second
+            db.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, ts, full_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + reset_after)
+            )
+            self._calls += 1
+            if self._calls % self._PRUNE_EVERY == 0:
+                db.execute("DELETE FROM buckets WHERE full_at < ?", (now,))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+        return RateLimitResult(
+            allowed=retry_after == 0.0,
+            remaining=int(tokens),
+            reset_after=reset_after,
+            retry_after=retry_after
+        )
+
+    async def consume(self, key: str, capacity: int, refill_per_second: float, cost: int = 1) -> RateLimitResult:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._consume, key, capacity, refill_per_second, cost)
+
+
+# Atomic token bucket; Redis TIME is used so all API hosts share one clock
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisRateLimitBackend:
+    """Token buckets shared by every worker and host through Redis (requires the `redis` package)"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def consume(self, key: str, capacity: int, refill_per_second: float, cost: int = 1) -> RateLimitResult:
+        allowed, tokens = await self._script(
+            keys=[f"ratelimit:{key}"],
+            args=[capacity, refill_per_second, cost]
+        )
+        tokens = float(tokens)
+        return RateLimitResult(
+            allowed=bool(allowed),
+            remaining=int(tokens),
+            reset_after=(capacity - tokens) / refill_per_second,
+            retry_after=0.0 if allowed else (cost - tokens) / refill_per_second
+        )
+
+
+def create_backend():
+    if RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimitBackend(RATE_LIMIT_REDIS_URL)
+    if RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteRateLimitBackend(RATE_LIMIT_SQLITE_PATH)
+    return InMemoryRateLimitBackend()
+
+
+_backend = None
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+    return _backend
+
+
+# scope -> requests per minute (bucket capacity; refilled evenly over 60s)
+LIMITS = {
+    "crud": RATE_LIMIT_CRUD_PER_MINUTE,
+    "ai": RATE_LIMIT_AI_PER_MINUTE,
+}
+
+
+def bucket_limit(scope: str) -> int:
+    """Requests per minute of one bucket; per-worker buckets get a share of the host's limit"""
+    per_minute = LIMITS[scope]
+    if getattr(get_backend(), "per_worker", False):
+        per_minute = max(1, math.ceil(per_minute / RATE_LIMIT_WORKERS))
+    return per_minute
+
+
+async def _consume(scope: str, identity: str) -> Optional[Tuple[RateLimitResult, int]]:
+    """(result, bucket limit) for one token of identity in scope; None when limiting is off or the backend failed"""
+    if not RATE_LIMIT_ENABLED:
+        return None
+
+    try:
+        per_minute = bucket_limit(scope)
+        result = await get_backend().consume(f"{scope}:{identity}", per_minute, per_minute / 60.0)
+    except Exception as e:
+        # Rate limiter arızası API'yi durdurmamalı (fail-open)
+        print(f"Rate limit backend error: {e}")
+        return None
+    return result, per_minute
+
+
+async def enforce(scope: str, identity: str, response: Response):
+    """Consume one token for identity in scope; raise 429 when the bucket is empty"""
+    consumed = await _consume(scope, identity)
+    if consumed is None:
+        return
+
+    result, per_minute = consumed
+    headers = {
+        "RateLimit-Limit": str(per_minute),
+        "RateLimit-Remaining": str(result.remaining),
+        "RateLimit-Reset": str(math.ceil(result.reset_after)),
+        "RateLimit-Policy": f"{per_minute};w=60",
+    }
+    if not result.allowed:
+        headers["Retry-After"] = str(math.ceil(result.retry_after))
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded - please try again later",
+            headers=headers
+        )
+    response.headers.update(headers)
+
+
+async def try_consume(scope: str, identity: str) -> bool:
+    """
+    Consume one token without failing the request, for optional work inside
+    an endpoint (e.g. AI extraction on note writes); False means skip it.
+    """
+    consumed = await _consume(scope, identity)
+    return consumed is None or consumed[0].allowed
+
+
+def rate_limit_user(scope: str):
+    """Dependency limiting authenticated requests per Firebase uid"""
+    async def dependency(response: Response, current_user: dict = Depends(get_current_user)):
+        await enforce(scope, f"uid:{current_user['uid']}", response)
+    return dependency
+
+
+def rate_limit_client(scope: str):
+    """Dependency limiting unauthenticated requests per client IP"""
+    async def dependency(request: Request, response: Response):
+        client_ip = request.client.host if request.client else "unknown"
+        await enforce(scope, f"ip:{client_ip}", response)
+    return dependency
@@ -1,18 +1,116 @@
-from firebase_config import db
-from schemas import NoteCreate, NoteUpdate, NoteResponse
-from typing import List, Optional
+from firebase_config import get_db, run_db
+from note_stats import STAT_FIELDS, add_stats_increment, stats_delta, stats_ref, reconcile_user_stats
+from cache import cache
+from compaction import estimate_document_size
+from schemas import NoteCreate, NoteUpdate, NoteResponse, NoteImportItem
+from content_utils import content_hash, split_paragraphs
+from typing import Awaitable, Callable, Iterator, List, Optional, Tuple
 from datetime import datetime
+import re
 import uuid
-from google.cloud import firestore
+from config import EXPORT_PAGE_SIZE, IMPORT_BATCH_MAX_BYTES
+
+class NoteIdConflictError(Exception):
+    """The requested note ID is already used by another user's note"""
+
+# Async callable: content -> extracted todos, or None if extraction failed
+TodoExtractor = Callable[[str], Awaitable[Optional[List[str]]]]
+
+_WORD = re.compile(r"\w+")
+
+def _paragraphs_with_hashes(content: str) -> List[Tuple[str, str]]:
+    """(paragraph, hash) pairs of content; repeated paragraphs appear once"""
+    pairs = {}
+    for paragraph in split_paragraphs(content):
+        pairs.setdefault(content_hash(paragraph), paragraph)
+    return [(paragraph, paragraph_hash) for paragraph_hash, paragraph in pairs.items()]
+
+def _word_stems(text: str) -> set:
+    # Türkçe ekler yüzünden kelimeler ilk 5 harfiyle karşılaştırılır
+    return {word[:5] for word in _WORD.findall(text.casefold()) if len(word) > 2}
+
+def _paragraph_todo_groups(paragraphs: List[Tuple[str, str]], todos: List[str]) -> list:
+    """
+    One todo group per paragraph: each todo goes to the paragraph sharing the
+    most words with it. Todos matching no paragraph get a group spanning all
+    of them; when any of those paragraphs changes, _refresh_todo_groups
+    re-extracts all of them.
+    """
+    stems = [_word_stems(paragraph) for paragraph, _ in paragraphs]
+    per_paragraph = [[] for _ in paragraphs]
+    unmatched = []
+    for todo in todos:
+        todo_stems = _word_stems(todo)
+        scores = [len(todo_stems & paragraph_stems) for paragraph_stems in stems]
+        best = max(range(len(scores)), key=scores.__getitem__, default=None)
+        if best is not None and scores[best]:
+            per_paragraph[best].append(todo)
+        else:
+            unmatched.append(todo)
+    
+    groups = [{"paragraphs": [h], "todos": group_todos} for (_, h), group_todos in zip(paragraphs, per_paragraph)]
+    if unmatched:
+        groups.append({"paragraphs": [h for _, h in paragraphs], "todos": unmatched})
+    return groups
+
+def _note_write_batch(db, owner_uid: str, before: Optional[dict], after: Optional[dict]):
+    """WriteBatch pre-loaded with the owner's stats change for before -> after; add the note write and commit"""
+    batch = db.batch()
+    add_stats_increment(batch, db, owner_uid, stats_delta(before, after))
+    return batch
+
+async def _invalidate_owner(owner_uid: str):
+    """The owner's notes list and stats changed; drop them from every worker's cache"""
+    await cache.invalidate_many([("notes", owner_uid), ("stats", owner_uid)])
+
+def _update_note_in_transaction(db, doc_ref, owner_uid: str, build: Callable[[dict], Optional[dict]]):
+    """
+    Read the note and apply build(note) in one transaction, together with the
+    owner's stats change. Returns (note before, update) with note None when it
+    is missing or not the owner's, and update None when build skipped it.
+    """
+    from google.cloud import firestore
+    
+    @firestore.transactional
+    def apply(transaction):
+        snapshot = doc_ref.get(transaction=transaction)
+        note = snapshot.to_dict() if snapshot.exists else None
+        if note is None or note.get("owner_uid") != owner_uid:
+            return None, None
+        update_data = build(note)
+        if update_data is not None:
+            add_stats_increment(transaction, db, owner_uid, stats_delta(note, {**note, **update_data}))
+            transaction.update(doc_ref, update_data)
+        return note, update_data
+    
+    return apply(db.transaction())
+
+def _todos_from_groups(groups: list) -> List[str]:
+    """Flatten todo groups into a single list, dropping duplicates"""
+    todos = []
+    for group in groups:
+        for todo in group["todos"]:
+            if todo not in todos:
+                todos.append(todo)
+    return todos
 
 class NotesRepository:
-    def __init__(self):
-        self.collection = db.collection('notes')
+    @property
+    def collection(self):
+        # Firestore client is created lazily (see main.lifespan)
+        return get_db().collection('notes')
     
-    async def create_note(self, note_data: NoteCreate, owner_uid: str) -> NoteResponse:
-        """Create a new note"""
+    async def create_note(self, note_data: NoteCreate, owner_uid: str, note_id: Optional[str] = None) -> Tuple[NoteResponse, bool]:
+        """
+        Create a new note with a create() precondition, so a retried request
+        never overwrites it. Returns (note, created); when the ID already
+        exists for this owner the stored note is returned with created=False.
+        The owner's stats are incremented in the same batch.
+        """
+        from google.api_core.exceptions import Conflict
+        
         # Frontend'den gelen ID'yi kullan, yoksa yeni oluştur
-        note_id = getattr(note_data, 'id', None) or str(uuid.uuid4())
+        note_id = note_id or getattr(note_data, 'id', None) or str(uuid.uuid4())
         now = datetime.utcnow()
         
         note_doc = {
@@ -25,24 +123,43 @@ class NotesRepository:
             "dirty": False,
             "deleted": False,
             "hasTodos": False,
-            "todos": []
+            "todos": [],
+            "contentHash": content_hash(note_data.content)
         }
         
-        # Direct Firestore operation - much faster
-        self.collection.document(note_id).set(note_doc)
+        db = get_db()
+        doc_ref = db.collection('notes').document(note_id)
+        batch = _note_write_batch(db, owner_uid, None, note_doc)
+        batch.create(doc_ref, note_doc)
+        try:
+            await run_db(batch.commit)
+        except Conflict:
+            existing = await run_db(doc_ref.get)
+            existing_note = existing.to_dict() or {}
+            if existing_note.get("owner_uid") != owner_uid:
+                raise NoteIdConflictError(note_id)
+            return NoteResponse(**existing_note), False
         
-        return NoteResponse(**note_doc)
+        await _invalidate_owner(owner_uid)
+        return NoteResponse(**note_doc), True
     
     async def get_notes_by_owner(self, owner_uid: str) -> List[NoteResponse]:
-        """Get all notes for a specific owner"""
+        """Get all notes for a specific owner (cached per owner only when the notes cache namespace is enabled)"""
+        async def load() -> List[dict]:
+            notes = await self._query_owner_notes(owner_uid)
+            return [note.model_dump(mode="json") for note in notes]
+        
+        return [NoteResponse(**note) for note in await cache.get_or_load("notes", owner_uid, load)]
+    
+    async def _query_owner_notes(self, owner_uid: str) -> List[NoteResponse]:
         notes = []
         try:
             # Simplified query without order_by to avoid index requirement
-            docs = (self.collection
-                    .where("owner_uid", "==", owner_uid)
-                    .where("deleted", "==", False)
-                    .limit(100)
-                    .stream())
+            query = (self.collection
+                     .where("owner_uid", "==", owner_uid)
+                     .where("deleted", "==", False)
+                     .limit(100))
+            docs = await run_db(lambda: list(query.stream()))
             
             for doc in docs:
                 note_data = doc.to_dict()
@@ -54,7 +171,8 @@ class NotesRepository:
         except Exception as e:
             print(f"Firestore query error: {e}")
             # Fallback: get all notes and filter in Python
-            docs = self.collection.limit(100).stream()
+            query = self.collection.limit(100)
+            docs = await run_db(lambda: list(query.stream()))
             for doc in docs:
                 note_data = doc.to_dict()
                 if (note_data.get("owner_uid") == owner_uid and 
@@ -64,9 +182,111 @@ class NotesRepository:
         
         return notes
     
+    def iter_owner_notes(self, owner_uid: str, include_deleted: bool = False, page_size: int = EXPORT_PAGE_SIZE) -> Iterator[dict]:
+        """
+        Yield every note of the owner page by page with a document-id cursor,
+        so memory stays constant regardless of how many notes the user has.
+        Blocking; meant to be consumed from a worker thread.
+        """
+        from google.cloud.firestore_v1.field_path import FieldPath
+        
+        query = self.collection.where("owner_uid", "==", owner_uid)
+        if not include_deleted:
+            query = query.where("deleted", "==", False)
+        query = query.order_by(FieldPath.document_id()).limit(page_size)
+        
+        last_doc = None
+        while True:
+            page = query.start_after(last_doc) if last_doc is not None else query
+            docs = list(page.stream())
+            for doc in docs:
+                yield doc.to_dict()
+            if len(docs) < page_size:
+                break
+            last_doc = docs[-1]
+    
+    async def import_notes(self, items: List[NoteImportItem], owner_uid: str) -> Tuple[int, int]:
+        """
+        Write one chunk of imported notes in a single WriteBatch (split when it
+        would exceed IMPORT_BATCH_MAX_BYTES). Notes whose ID already belongs
+        to another user are skipped.
+        Returns (written, skipped).
+        """
+        written, skipped = await run_db(self._write_import_batch, items, owner_uid)
+        if written:
+            await _invalidate_owner(owner_uid)
+        return written, skipped
+    
+    def _write_import_batch(self, items: List[NoteImportItem], owner_uid: str) -> Tuple[int, int]:
+        db = get_db()
+        now = datetime.utcnow()
+        
+        # Aynı ID birden fazla satırda geçerse sonuncusu kazanır
+        by_id = {}
+        for item in items:
+            by_id[item.id or str(uuid.uuid4())] = item
+        
+        refs = [db.collection('notes').document(note_id) for note_id in by_id]
+        existing = {
+            snap.id: snap.to_dict()
+            for snap in db.get_all(refs, field_paths=["owner_uid", "deleted", "todos"])
+            if snap.exists
+        }
+        
+        def commit(batch, delta):
+            add_stats_increment(batch, db, owner_uid, tuple(delta))
+            batch.commit()
+        
+        batch = db.batch()
+        batch_writes = 0
+        batch_bytes = 0
+        written = 0
+        skipped = len(items) - len(by_id)
+        delta = [0, 0, 0]
+        for ref, (note_id, item) in zip(refs, by_id.items()):
+            previous = existing.get(note_id)
+            if previous is not None and previous.get("owner_uid") != owner_uid:
+                skipped += 1
+                continue
+            note_doc = {
+                "id": note_id,
+                "title": item.title,
+                "content": item.content,
+                "owner_uid": owner_uid,
+                "created_at": item.createdAt or now,
+                "updated_at": item.updatedAt or now,
+                "dirty": False,
+                "deleted": item.deleted,
+                "hasTodos": len(item.todos) > 0,
+                "todos": item.todos,
+                "contentHash": content_hash(item.content)
+            }
+            doc_bytes = estimate_document_size(ref.path, note_doc)
+            # Büyük notlar 10 MiB commit sınırını aşmasın diye birden fazla commit'e bölünür
+            if batch_writes and batch_bytes + doc_bytes > IMPORT_BATCH_MAX_BYTES:
+                commit(batch, delta)
+                batch, batch_writes, batch_bytes, delta = db.batch(), 0, 0, [0, 0, 0]
+            batch.set(ref, note_doc)
+            for i, value in enumerate(stats_delta(previous, note_doc)):
+                delta[i] += value
+            batch_writes += 1
+            batch_bytes += doc_bytes
+            written += 1
+        
+        if batch_writes:
+            commit(batch, delta)
+        return written, skipped
+    
+    def watch_owner_notes(self, owner_uid: str, callback):
+        """Start a Firestore listener on the owner's live notes; returns the Watch handle"""
+        return (self.collection
+                .where("owner_uid", "==", owner_uid)
+                .where("deleted", "==", False)
+                .on_snapshot(callback))
+    
     async def get_note_by_id(self, note_id: str, owner_uid: str) -> Optional[NoteResponse]:
         """Get a specific note by ID"""
-        doc = self.collection.document(note_id).get()
+        doc = await run_db(self.collection.document(note_id).get)
         
         if not doc.exists:
             return None
@@ -79,39 +299,110 @@ class NotesRepository:
         
         return NoteResponse(**note_data)
     
-    async def update_note(self, note_id: str, note_data: NoteUpdate, owner_uid: str) -> Optional[NoteResponse]:
-        """Update a note"""
-        doc_ref = self.collection.document(note_id)
-        doc = doc_ref.get()
-        
-        if not doc.exists:
-            return None
+    async def update_note(
+        self,
+        note_id: str,
+        note_data: NoteUpdate,
+        owner_uid: str,
+        todo_extractor: Optional[TodoExtractor] = None
+    ) -> Optional[NoteResponse]:
+        """
+        Update a note. When the content hash changes and a todo_extractor is
+        given, only paragraphs not covered by a still-valid todo group are
+        sent to the extractor and the result is merged with the kept todos.
+        The extraction runs after the content is written and its result is
+        applied only if the content has not changed again meanwhile.
+        """
+        db = get_db()
+        doc_ref = db.collection('notes').document(note_id)
+        now = datetime.utcnow()
         
-        existing_note = doc.to_dict()
+        def content_update(note: dict) -> dict:
+            # Update only provided fields
+            update_data = {"updated_at": now}
+            if note_data.title is not None:
+                update_data["title"] = note_data.title
+            if note_data.content is not None:
+                update_data["content"] = note_data.content
+                new_hash = content_hash(note_data.content)
+                if new_hash != (note.get("contentHash") or content_hash(note.get("content", ""))):
+                    update_data["contentHash"] = new_hash
+            return update_data
         
-        # Check if the note belongs to the owner
-        if existing_note.get("owner_uid") != owner_uid:
+        existing_note, update_data = await run_db(_update_note_in_transaction, db, doc_ref, owner_uid, content_update)
+        if existing_note is None:
             return None
+        await _invalidate_owner(owner_uid)
         
-        # Update only provided fields
-        update_data = {"updated_at": datetime.utcnow()}
+        new_hash = update_data.get("contentHash")
+        if new_hash is not None and todo_extractor is not None:
+            todo_fields = await self._refresh_todo_groups(existing_note, note_data.content, todo_extractor)
+            # AI çağrısı sırasında not tekrar değiştiyse sonuç atılır; o güncelleme kendi çıkarımını yapar
+            _, applied = await run_db(
+                _update_note_in_transaction, db, doc_ref, owner_uid,
+                lambda note: todo_fields if note.get("contentHash") == new_hash else None
+            )
+            if applied is not None:
+                await _invalidate_owner(owner_uid)
         
-        if note_data.title is not None:
-            update_data["title"] = note_data.title
+        # Get updated document
+        updated_doc = await run_db(doc_ref.get)
+        return NoteResponse(**updated_doc.to_dict())
+    
+    async def _refresh_todo_groups(self, existing_note: dict, content: str, todo_extractor: TodoExtractor) -> dict:
+        """
+        Todo groups map paragraph hashes to the todos extracted from them
+        (normally one paragraph per group). Groups whose paragraphs are all
+        still present are kept; the remaining paragraphs, and the surviving
+        paragraphs of dropped groups, are extracted in one call and their
+        todos are split into per-paragraph groups.
+        """
+        paragraphs = _paragraphs_with_hashes(content)
+        present = {h for _, h in paragraphs}
         
-        if note_data.content is not None:
-            update_data["content"] = note_data.content
+        # Eski notlarda todoGroups yok: tüm paragraflar bir kez yeniden çıkarılır
+        groups = existing_note.get("todoGroups", [])
+        redo = set()
+        while True:
+            kept_groups = [
+                group for group in groups
+                if set(group["paragraphs"]) <= present and not redo & set(group["paragraphs"])
+            ]
+            # Düşen bir grubun (ör. eşleşmeyen todolar) hâlâ duran paragrafları da yeniden çıkarılır,
+            # yoksa o todolar kaybolur
+            dropped = {
+                h for group in groups if group not in kept_groups
+                for h in group["paragraphs"] if h in present
+            }
+            if dropped <= redo:
+                break
+            redo |= dropped
+        covered = {h for group in kept_groups for h in group["paragraphs"]}
+        pending = [(p, h) for p, h in paragraphs if h not in covered]
         
-        doc_ref.update(update_data)
+        groups = kept_groups
+        todos = _todos_from_groups(groups)
+        if pending:
+            extracted = await todo_extractor("\n\n".join(p for p, _ in pending))
+            if extracted is not None:
+                groups = kept_groups + _paragraph_todo_groups(pending, extracted)
+                todos = _todos_from_groups(groups)
+            else:
+                # Extraction failed: the paragraphs stay uncovered so the next update
+                # retries them, and the note keeps the todos it already had
+                todos += [todo for todo in existing_note.get("todos", []) if todo not in todos]
         
-        # Get updated document
-        updated_doc = doc_ref.get()
-        return NoteResponse(**updated_doc.to_dict())
+        return {
+            "todoGroups": groups,
+            "todos": todos,
+            "hasTodos": len(todos) > 0
+        }
     
     async def delete_note(self, note_id: str, owner_uid: str) -> bool:
         """Soft delete a note"""
-        doc_ref = self.collection.document(note_id)
-        doc = doc_ref.get()
+        db = get_db()
+        doc_ref = db.collection('notes').document(note_id)
+        doc = await run_db(doc_ref.get)
         
         if not doc.exists:
             return False
@@ -123,17 +414,22 @@ class NotesRepository:
             return False
         
         # Soft delete - direct operation
-        doc_ref.update({
+        update_data = {
             "deleted": True,
             "updated_at": datetime.utcnow()
-        })
+        }
+        batch = _note_write_batch(db, owner_uid, note_data, {**note_data, **update_data})
+        batch.update(doc_ref, update_data)
+        await run_db(batch.commit)
+        await _invalidate_owner(owner_uid)
         
         return True
     
     async def hard_delete_note(self, note_id: str, owner_uid: str) -> bool:
         """Permanently delete a note"""
-        doc_ref = self.collection.document(note_id)
-        doc = doc_ref.get()
+        db = get_db()
+        doc_ref = db.collection('notes').document(note_id)
+        doc = await run_db(doc_ref.get)
         
         if not doc.exists:
             return False
@@ -144,32 +440,85 @@ class NotesRepository:
         if note_data.get("owner_uid") != owner_uid:
             return False
         
-        doc_ref.delete()
+        batch = _note_write_batch(db, owner_uid, note_data, None)
+        batch.delete(doc_ref)
+        await run_db(batch.commit)
+        await _invalidate_owner(owner_uid)
         return True
     
-    async def update_note_todos(self, note_id: str, todos: list, owner_uid: str) -> NoteResponse:
-        """Update note with extracted todos"""
-        doc_ref = self.collection.document(note_id)
-        doc = doc_ref.get()
+    async def get_note_for_summary(self, note_id: str, owner_uid: str) -> Optional[dict]:
+        """Get content and stored summary fields of a note"""
+        doc = await run_db(self.collection.document(note_id).get)
         
         if not doc.exists:
-            raise Exception("Note not found")
+            return None
         
         note_data = doc.to_dict()
         
         # Check if the note belongs to the owner
-        if note_data.get("owner_uid") != owner_uid:
-            raise Exception("Unauthorized")
+        if note_data.get("owner_uid") != owner_uid or note_data.get("deleted", False):
+            return None
         
-        # Update todos
-        update_data = {
+        return {
+            "content": note_data.get("content", ""),
+            "summary": note_data.get("summary"),
+            "keyPoints": note_data.get("keyPoints", []),
+            "summaryContentHash": note_data.get("summaryContentHash")
+        }
+    
+    async def save_note_summary(self, note_id: str, summary: str, key_points: List[str], summary_content_hash: str) -> None:
+        """Persist a computed summary; updated_at is left untouched since the note itself did not change"""
+        await run_db(self.collection.document(note_id).update, {
+            "summary": summary,
+            "keyPoints": key_points,
+            "summaryContentHash": summary_content_hash
+        })
+    
+    async def update_note_todos(self, note_id: str, todos: list, owner_uid: str, content: str) -> NoteResponse:
+        """
+        Store todos extracted from content, grouped per paragraph. Skipped when
+        the note no longer has that content (its update extracts the changes).
+        """
+        db = get_db()
+        doc_ref = db.collection('notes').document(note_id)
+        expected_hash = content_hash(content)
+        todo_fields = {
             "updated_at": datetime.utcnow(),
-            "hasTodos": True,
-            "todos": todos
+            "hasTodos": len(todos) > 0,
+            "todos": todos,
+            "todoGroups": _paragraph_todo_groups(_paragraphs_with_hashes(content), todos)
         }
         
-        doc_ref.update(update_data)
+        note, applied = await run_db(
+            _update_note_in_transaction, db, doc_ref, owner_uid,
+            lambda note: todo_fields if note.get("contentHash") == expected_hash else None
+        )
+        if note is None:
+            raise Exception("Note not found")
+        if applied is not None:
+            await _invalidate_owner(owner_uid)
         
         # Get updated document
-        updated_doc = doc_ref.get()
+        updated_doc = await run_db(doc_ref.get)
         return NoteResponse(**updated_doc.to_dict())
+    
+    async def get_stats(self, owner_uid: str) -> dict:
+        """
+        Note counters from the owner's aggregate document (one read; cached
+        when the stats namespace is enabled). Aggregates that were never recounted (missing,
+        or only built from increments after deploy) or went negative are
+        recounted once.
+        """
+        async def load() -> dict:
+            doc = await run_db(stats_ref(get_db(), owner_uid).get)
+            stats = doc.to_dict() if doc.exists else {}
+            # reconciled_at yoksa sayaçlar deploy öncesi notları içermez
+            if "reconciled_at" not in stats or any(stats.get(field, 0) < 0 for field in STAT_FIELDS):
+                stats = await run_db(reconcile_user_stats, owner_uid)
+            return {
+                "totalNotes": stats.get("total_notes", 0),
+                "notesWithTodos": stats.get("notes_with_todos", 0),
+                "openTodos": stats.get("open_todos", 0)
+            }
+        
+        return await cache.get_or_load("stats", owner_uid, load)
@@ -1,64 +1,158 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from schemas import NoteCreate, NoteUpdate, NoteResponse, NoteSummaryRequest, NoteSummaryResponse, TodoExtractionRequest, TodoExtractionResponse
-from repository import NotesRepository
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from schemas import NoteCreate, NoteUpdate, NoteResponse, NoteSummaryRequest, NoteSummaryResponse, TodoExtractionRequest, TodoExtractionResponse, NoteImportItem, NoteImportResponse, NoteStatsResponse
+from repository import NotesRepository, NoteIdConflictError
+from idempotency import note_id_for_key
+from cache import cache
 from auth import get_current_user
-from ai_service import AIService
+from rate_limit import rate_limit_user, rate_limit_client, try_consume, bucket_limit
+from token_usage import track_ai_endpoint
+from ai_service import get_ai_service
 import asyncio
-from config import REQUEST_TIMEOUT
+import math
+from content_utils import content_hash
+from note_stream import NoteChangeHub, FeedLimitError
+from config import (
+    REQUEST_TIMEOUT,
+    AI_TIMEOUT,
+    PRECOMPUTE_SUMMARIES,
+    STREAM_HEARTBEAT_SECONDS,
+    STREAM_MAX_CONNECTION_SECONDS,
+    IMPORT_BATCH_SIZE,
+    IMPORT_BATCH_MAX_BYTES,
+    IMPORT_MAX_LINE_BYTES
+)
+from pydantic import ValidationError
+import json
 
 router = APIRouter(prefix="/api/notes", tags=["notes"])
 notes_repo = NotesRepository()
-ai_service = None  # Lazy loading
+change_hub = NoteChangeHub(notes_repo)
 
-@router.post("", response_model=NoteResponse)
+crud_limit = Depends(rate_limit_user("crud"))
+ai_client_limit = Depends(rate_limit_client("ai"))
+# AI çağrısı yapan route'lar token kullanımını kendi adlarıyla kaydeder
+ai_endpoint = Depends(track_ai_endpoint)
+
+async def extract_todos_or_none(content: str, owner_uid: str) -> Optional[List[str]]:
+    """
+    Todo extraction for the repository; None means it failed or the user's
+    AI budget is spent, and it should be retried later
+    """
+    # Not yazmaları crud bütçesinden, gerçekten çalışan AI çağrısı ai bütçesinden düşer
+    if not await try_consume("ai", f"uid:{owner_uid}"):
+        print("AI rate limit reached, todo extraction skipped")
+        return None
+    try:
+        ai_service = get_ai_service()
+    except ValueError as e:
+        print(f"AI servisi başlatılamadı: {str(e)}")
+        return None
+    try:
+        result = await asyncio.wait_for(ai_service.extract_todos(content), timeout=AI_TIMEOUT)
+    except asyncio.TimeoutError:
+        print("AI todo extraction timeout")
+        return None
+    except Exception as e:
+        print(f"AI todo extraction error: {e}")
+        return None
+    if result.get("fallback"):
+        return None
+    return result["todos"]
+
+async def get_or_compute_summary(note_id: str, note: dict, charge_uid: Optional[str] = None) -> dict:
+    """
+    Return the stored summary while its content hash still matches the note,
+    otherwise summarize with AI and persist the result on the note document.
+    With charge_uid, a computed summary costs one token of that user's AI
+    budget (429 when it is spent); stored summaries are free.
+    """
+    current_hash = content_hash(note["content"])
+    if note.get("summary") is not None and note.get("summaryContentHash") == current_hash:
+        summary = note["summary"]
+        key_points = note.get("keyPoints", [])
+    else:
+        if charge_uid is not None and not await try_consume("ai", f"uid:{charge_uid}"):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded - please try again later",
+                headers={"Retry-After": str(math.ceil(60 / bucket_limit("ai")))}
+            )
+        ai_service = get_ai_service()
+        result = await asyncio.wait_for(ai_service.summarize_note(note["content"]), timeout=AI_TIMEOUT)
+        summary = result["summary"]
+        key_points = result["keyPoints"]
+        # Hata/timeout yedek özetleri kaydedilmez
+        if not result.get("fallback"):
+            await notes_repo.save_note_summary(note_id, summary, key_points, current_hash)
+    
+    return {
+        "summary": summary,
+        "keyPoints": key_points,
+        "wordCount": len(summary.split()),
+        "originalWordCount": len(note["content"].split())
+    }
+
+async def precompute_summary(note_id: str, owner_uid: str):
+    """Background task: make sure the stored summary matches the current content"""
+    try:
+        note = await notes_repo.get_note_for_summary(note_id, owner_uid)
+        if note and len(note["content"].strip()) >= 5:
+            await get_or_compute_summary(note_id, note)
+    except Exception as e:
+        print(f"Summary precompute error: {e}")
+
+@router.post("", response_model=NoteResponse, dependencies=[crud_limit, ai_endpoint])
 async def create_note(
     note_data: NoteCreate,
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Create a new note with automatic AI todo extraction"""
+    """
+    Create a new note with automatic AI todo extraction.
+    Retries with the same Idempotency-Key (or the same client note ID) return
+    the stored note without another write or AI call, on any worker of the
+    host; concurrent retries wait for the first request's result.
+    """
+    owner_uid = current_user["uid"]
     try:
-        # Önce normal notu oluştur
-        note = await notes_repo.create_note(note_data, current_user["uid"])
+        note_id = note_data.id or (note_id_for_key(owner_uid, idempotency_key) if idempotency_key else None)
         
-        # AI ile otomatik todo extraction yap (sadece yeterli içerik varsa)
-        if len(note_data.content.strip()) >= 5:
-            try:
-                global ai_service
-                if ai_service is None:
-                    try:
-                        ai_service = AIService()
-                    except ValueError as e:
-                        print(f"AI servisi başlatılamadı: {str(e)}")
-                        return note
+        async def create() -> dict:
+            # Önce normal notu oluştur
+            note, created = await notes_repo.create_note(note_data, owner_uid, note_id)
+            
+            if created:
+                if PRECOMPUTE_SUMMARIES:
+                    background_tasks.add_task(precompute_summary, note.id, owner_uid)
                 
-                result = await asyncio.wait_for(
-                    ai_service.extract_todos(note_data.content),
-                    timeout=35.0
-                )
-                
-                if result["hasTodos"] and result["todos"]:
-                    # Todo'lar bulundu, notu güncelle
-                    updated_note = await notes_repo.update_note_todos(
-                        note.id, 
-                        result["todos"], 
-                        current_user["uid"]
-                    )
-                    return updated_note
-                    
-            except asyncio.TimeoutError:
-                print("AI todo extraction timeout")
-            except Exception as e:
-                print(f"AI todo extraction error: {e}")
+                # AI ile otomatik todo extraction yap (sadece yeterli içerik varsa)
+                if len(note_data.content.strip()) >= 5:
+                    todos = await extract_todos_or_none(note_data.content, owner_uid)
+                    if todos is not None:
+                        # Sonucu (boş olsa bile) kaydet; sonraki güncellemeler sadece değişen paragrafları işler
+                        note = await notes_repo.update_note_todos(note.id, todos, owner_uid, note_data.content)
+            return note.model_dump(mode="json")
         
-        return note
+        if note_id:
+            note = await cache.get_or_load("idempotency", f"{owner_uid}:{note_id}", create)
+        else:
+            note = await create()
+        return NoteResponse(**note)
+    except NoteIdConflictError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Note ID is already in use"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create note: {str(e)}"
         )
 
-@router.get("", response_model=List[NoteResponse])
+@router.get("", response_model=List[NoteResponse], dependencies=[crud_limit])
 async def get_notes(current_user: dict = Depends(get_current_user)):
     """Get all notes for the current user"""
     try:
@@ -70,7 +164,156 @@ async def get_notes(current_user: dict = Depends(get_current_user)):
             detail=f"Failed to fetch notes: {str(e)}"
         )
 
-@router.get("/{note_id}", response_model=NoteResponse)
+@router.get("/stats", response_model=NoteStatsResponse, dependencies=[crud_limit])
+async def get_note_stats(current_user: dict = Depends(get_current_user)):
+    """Note counts for the current user, read from the incrementally maintained aggregate"""
+    try:
+        return await notes_repo.get_stats(current_user["uid"])
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch note stats: {str(e)}"
+        )
+
+@router.get("/export", dependencies=[crud_limit])
+async def export_notes(
+    include_deleted: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream all notes of the user as NDJSON (one note per line)"""
+    def ndjson_lines():
+        # Starlette iterates sync generators in a worker thread
+        for note_data in notes_repo.iter_owner_notes(current_user["uid"], include_deleted=include_deleted):
+            yield NoteResponse(**note_data).model_dump_json(by_alias=True) + "\n"
+    
+    return StreamingResponse(
+        ndjson_lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="notes.ndjson"'}
+    )
+
+@router.post("/import", response_model=NoteImportResponse, dependencies=[crud_limit])
+async def import_notes(
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Import notes from an NDJSON upload (the export format). The body is read
+    incrementally and written in WriteBatch chunks; the next chunk is only
+    read after the previous batch has been committed.
+    """
+    imported = 0
+    skipped = 0
+    errors: List[str] = []
+    batch: List[NoteImportItem] = []
+    batch_bytes = 0
+    line_number = 0
+    
+    async def flush():
+        nonlocal imported, skipped, batch, batch_bytes
+        if batch:
+            written, not_written = await notes_repo.import_notes(batch, current_user["uid"])
+            imported += written
+            skipped += not_written
+            batch = []
+            batch_bytes = 0
+    
+    def add_line(raw: bytes):
+        nonlocal skipped, batch_bytes
+        if not raw.strip():
+            return
+        try:
+            item = NoteImportItem.model_validate(json.loads(raw))
+            if item.id is not None and (not item.id or "/" in item.id):
+                raise ValueError("invalid note id")
+            batch.append(item)
+            batch_bytes += len(raw)
+        except (ValueError, ValidationError) as e:
+            skipped += 1
+            if len(errors) < 20:
+                errors.append(f"line {line_number}: {str(e).splitlines()[0]}")
+    
+    try:
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            if len(buffer) > IMPORT_MAX_LINE_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Line {line_number + len(lines) + 1} exceeds {IMPORT_MAX_LINE_BYTES} bytes"
+                )
+            for raw in lines:
+                line_number += 1
+                add_line(raw)
+                # Sayı veya boyut sınırına ulaşan batch yazılır
+                if len(batch) >= IMPORT_BATCH_SIZE or batch_bytes >= IMPORT_BATCH_MAX_BYTES:
+                    await flush()
+        line_number += 1
+        add_line(buffer)
+        await flush()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to import notes after {imported} notes: {str(e)}"
+        )
+    
+    return NoteImportResponse(imported=imported, skipped=skipped, errors=errors)
+
+@router.get("/stream", dependencies=[crud_limit])
+async def stream_note_changes(
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Server-Sent Events feed of the user's note changes (added/modified/removed).
+    A "ready" event is sent once the listener is live; clients should then
+    refresh from GET /api/notes. A "resync" event means events were dropped.
+    """
+    owner_uid = current_user["uid"]
+    try:
+        queue = await change_hub.subscribe(owner_uid)
+    except FeedLimitError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "30"}
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to open note stream: {str(e)}"
+        )
+    
+    async def event_stream():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + STREAM_MAX_CONNECTION_SECONDS
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0 or await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=min(STREAM_HEARTBEAT_SECONDS, remaining))
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    yield "event: resync\ndata: {}\n\n"
+                    break
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+        finally:
+            change_hub.unsubscribe(owner_uid, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/{note_id}", response_model=NoteResponse, dependencies=[crud_limit])
 async def get_note(
     note_id: str,
     current_user: dict = Depends(get_current_user)
@@ -92,20 +335,28 @@ async def get_note(
             detail=f"Failed to fetch note: {str(e)}"
         )
 
-@router.put("/{note_id}", response_model=NoteResponse)
+@router.put("/{note_id}", response_model=NoteResponse, dependencies=[crud_limit, ai_endpoint])
 async def update_note(
     note_id: str,
     note_data: NoteUpdate,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user)
 ):
-    """Update a note"""
+    """Update a note; todos are re-extracted only for changed paragraphs"""
     try:
-        note = await notes_repo.update_note(note_id, note_data, current_user["uid"])
+        note = await notes_repo.update_note(
+            note_id,
+            note_data,
+            current_user["uid"],
+            todo_extractor=lambda content: extract_todos_or_none(content, current_user["uid"])
+        )
         if not note:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Note not found"
             )
+        if PRECOMPUTE_SUMMARIES and note_data.content is not None:
+            background_tasks.add_task(precompute_summary, note_id, current_user["uid"])
         return note
     except HTTPException:
         raise
@@ -115,7 +366,7 @@ async def update_note(
             detail=f"Failed to update note: {str(e)}"
         )
 
-@router.delete("/{note_id}")
+@router.delete("/{note_id}", dependencies=[crud_limit])
 async def delete_note(
     note_id: str,
     current_user: dict = Depends(get_current_user)
@@ -145,7 +396,7 @@ async def delete_note(
             detail=f"Failed to delete note: {str(e)}"
         )
 
-@router.delete("/{note_id}/permanent")
+@router.delete("/{note_id}/permanent", dependencies=[crud_limit])
 async def permanent_delete_note(
     note_id: str,
     current_user: dict = Depends(get_current_user)
@@ -167,7 +418,50 @@ async def permanent_delete_note(
             detail=f"Failed to permanently delete note: {str(e)}"
         )
 
-@router.post("/summarize", response_model=NoteSummaryResponse)
+@router.post("/{note_id}/summary", response_model=NoteSummaryResponse, dependencies=[crud_limit, ai_endpoint])
+async def note_summary(
+    note_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Notun özetini döndür; içerik değişmediyse Firestore'da saklanan özet kullanılır"""
+    try:
+        note = await notes_repo.get_note_for_summary(note_id, current_user["uid"])
+        if not note:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Note not found"
+            )
+        
+        if len(note["content"].strip()) < 5:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="İçerik çok kısa, özetleme için en az 5 karakter gerekli"
+            )
+        
+        try:
+            result = await get_or_compute_summary(note_id, note, charge_uid=current_user["uid"])
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"AI servisi başlatılamadı: {str(e)}"
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_408_REQUEST_TIMEOUT,
+                detail="AI özetleme işlemi zaman aşımına uğradı"
+            )
+        
+        return NoteSummaryResponse(**result)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Özetleme işlemi başarısız: {str(e)}"
+        )
+
+@router.post("/summarize", response_model=NoteSummaryResponse, dependencies=[ai_client_limit, ai_endpoint])
 async def summarize_note(
     request: NoteSummaryRequest,
     # current_user: dict = Depends(get_current_user)  # Test için geçici olarak kaldırıldı
@@ -181,22 +475,20 @@ async def summarize_note(
                 detail="İçerik çok kısa, özetleme için en az 5 karakter gerekli"
             )
         
-        # AI servisini lazy loading ile initialize et
-        global ai_service
-        if ai_service is None:
-            try:
-                ai_service = AIService()
-            except ValueError as e:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"AI servisi başlatılamadı: {str(e)}"
-                )
+        # Paylaşılan AI servisi (lifespan sırasında oluşturulur)
+        try:
+            ai_service = get_ai_service()
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"AI servisi başlatılamadı: {str(e)}"
+            )
         
         # AI servisi ile özetleme yap (timeout ile)
         try:
             result = await asyncio.wait_for(
                 ai_service.summarize_note(request.content),
-                timeout=35.0  # 35 saniye timeout
+                timeout=AI_TIMEOUT
             )
         except asyncio.TimeoutError:
             raise HTTPException(
@@ -219,7 +511,7 @@ async def summarize_note(
             detail=f"Özetleme işlemi başarısız: {str(e)}"
         )
 
-@router.post("/extract-todos", response_model=TodoExtractionResponse)
+@router.post("/extract-todos", response_model=TodoExtractionResponse, dependencies=[ai_client_limit, ai_endpoint])
 async def extract_todos(
     request: TodoExtractionRequest,
     # current_user: dict = Depends(get_current_user)  # Test için geçici olarak kaldırıldı
@@ -233,22 +525,20 @@ async def extract_todos(
                 detail="İçerik çok kısa, yapılacak iş algılama için en az 5 karakter gerekli"
             )
         
-        # AI servisini lazy loading ile initialize et
-        global ai_service
-        if ai_service is None:
-            try:
-                ai_service = AIService()
-            except ValueError as e:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"AI servisi başlatılamadı: {str(e)}"
-                )
+        # Paylaşılan AI servisi (lifespan sırasında oluşturulur)
+        try:
+            ai_service = get_ai_service()
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"AI servisi başlatılamadı: {str(e)}"
+            )
         
         # AI servisi ile yapılacak işleri çıkar (timeout ile)
         try:
             result = await asyncio.wait_for(
                 ai_service.extract_todos(request.content),
-                timeout=35.0  # 35 saniye timeout
+                timeout=AI_TIMEOUT
             )
         except asyncio.TimeoutError:
             raise HTTPException(
@@ -30,6 +30,28 @@ class NoteResponse(NoteBase):
             datetime: lambda v: v.isoformat()
         }
 
+class NoteImportItem(NoteBase):
+    """One NDJSON line of POST /api/notes/import (same shape as the export)"""
+    id: Optional[str] = None
+    createdAt: Optional[datetime] = Field(None, alias="created_at")
+    updatedAt: Optional[datetime] = Field(None, alias="updated_at")
+    deleted: bool = False
+    hasTodos: bool = False
+    todos: list[str] = Field(default_factory=list)
+
+    class Config:
+        populate_by_name = True
+
+class NoteImportResponse(BaseModel):
+    imported: int
+    skipped: int
+    errors: list[str] = Field(default_factory=list)
+
+class NoteStatsResponse(BaseModel):
+    totalNotes: int
+    notesWithTodos: int
+    openTodos: int
+
 class UserResponse(BaseModel):
     uid: str
     email: str
@@ -0,0 +1,89 @@
+"""
+Production launcher for the Connectinno Notes API.
+
+Runs several uvicorn worker processes and picks uvloop/httptools when they
+are installed. The app is passed as an import string, so this parent process
+never imports `main`; Firebase and the AI service are initialized inside each
+worker after it has been started, never in the supervisor.
+
+    python server.py                 # workers = CPU count
+    python server.py --workers 4 --port 8080
+"""
+import argparse
+import importlib.util
+import os
+import socket
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from config import HOST, PORT, WORKERS, KEEP_ALIVE_TIMEOUT, GRACEFUL_SHUTDOWN_TIMEOUT, BACKLOG, FORWARDED_ALLOW_IPS
+
+
+def available_cpus() -> int:
+    """CPU count visible to this process (respects container/cgroup affinity)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_workers() -> int:
+    """Worker count: WORKERS/WEB_CONCURRENCY when set, otherwise one per CPU"""
+    return WORKERS if WORKERS > 0 else available_cpus()
+
+
+def pick_loop() -> str:
+    """uvloop if installed, else the stdlib asyncio loop"""
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def pick_http() -> str:
+    """httptools if installed, else the pure-Python h11 parser"""
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Connectinno Notes API production server")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--loop", default=pick_loop())
+    parser.add_argument("--http", default=pick_http())
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    # Worker'lar config'i yeniden import eder; memory rate limit bütçesi worker'lara bölünür
+    os.environ.setdefault("RATE_LIMIT_WORKERS", str(workers))
+    print(f"Starting {workers} worker(s) on {args.host}:{args.port} (loop={args.loop}, http={args.http})")
+
+    config = uvicorn.Config(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=args.loop,
+        http=args.http,
+        backlog=BACKLOG,
+        timeout_keep_alive=KEEP_ALIVE_TIMEOUT,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+        access_log=False
+    )
+    server = uvicorn.Server(config)
+
+    if workers == 1:
+        server.run()
+        return
+
+    # The listening socket is shared by all workers. Accepted connections
+    # inherit TCP_NODELAY from it; without this, the asyncio loop on a shared
+    # socket leaves Nagle on and small responses stall ~40ms on delayed ACKs.
+    sock = config.bind_socket()
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    Multiprocess(config, target=server.run, sockets=[sock]).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import asyncio
+import os
+
+# Repository import'u config'i yükler; bu test Firestore'a dokunmaz
+for name in ("FIREBASE_PROJECT_ID", "FIREBASE_PRIVATE_KEY_ID", "FIREBASE_PRIVATE_KEY",
+             "FIREBASE_CLIENT_EMAIL", "FIREBASE_CLIENT_ID", "GEMINI_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+from repository import NotesRepository, _paragraphs_with_hashes, _paragraph_todo_groups
+
+async def test_todo_groups():
+    repo = NotesRepository()
+    content = "Ali ile görüşme ayarlanacak.\n\nHafta sonu planı belli değil.\n\nToplantı notları burada."
+    # "Raporu yöneticiye ilet" hiçbir paragrafla eşleşmez, tüm paragrafları kapsayan gruba düşer
+    todos = ["Ali ile görüş", "Raporu yöneticiye ilet"]
+    note = {"content": content, "todos": todos, "todoGroups": _paragraph_todo_groups(_paragraphs_with_hashes(content), todos)}
+    
+    calls = []
+    async def extractor(text):
+        calls.append(text)
+        return ["Ali ile perşembe görüş", "Raporu yöneticiye ilet"]
+    
+    print("\n--- İlgisiz paragraf düzenlenmeden kalırken tek paragraf değişir ---")
+    edited = content.replace("Ali ile görüşme ayarlanacak.", "Ali ile görüşme perşembe.")
+    result = await repo._refresh_todo_groups(note, edited, extractor)
+    print(f"Extractor'a giden: {calls}")
+    print(f"Todolar: {result['todos']}")
+    # Eşleşmeyen grubun tüm paragrafları yeniden çıkarılır, todo kaybolmaz
+    assert all(p in calls[0] for p in ("Ali ile görüşme perşembe.", "Hafta sonu planı", "Toplantı notları"))
+    assert "Raporu yöneticiye ilet" in result["todos"]
+    assert "Ali ile görüş" not in result["todos"]
+    
+    print("\n--- Başarısız çıkarım mevcut todoları korur ---")
+    async def failing(text):
+        return None
+    result = await repo._refresh_todo_groups({"content": content, "todos": todos}, edited, failing)
+    print(f"Todolar: {result['todos']}")
+    assert result["todos"] == todos
+    
+    print("\n✅ Todo grupları testi geçti")
+
+if __name__ == "__main__":
+    asyncio.run(test_todo_groups())
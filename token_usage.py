@@ -0,0 +1,53 @@
+"""
+Per-endpoint Gemini token accounting (per worker process).
+
+Routes that call the AI service declare the track_ai_endpoint dependency,
+which labels the request's context; AIService records every model call
+under (endpoint, prompt name, model). Usage is exposed at GET /health/ai-usage.
+"""
+from contextvars import ContextVar
+from typing import Dict, List, Tuple
+
+from fastapi import Request
+
+_current_endpoint: ContextVar[str] = ContextVar("ai_endpoint", default="internal")
+
+
+async def track_ai_endpoint(request: Request):
+    """Dependency labelling AI calls with the route that triggered them"""
+    route = request.scope.get("route")
+    _current_endpoint.set(f"{request.method} {route.path if route else request.url.path}")
+
+
+class TokenUsageStats:
+    def __init__(self):
+        # (endpoint, prompt name, model) -> counters
+        self._usage: Dict[Tuple[str, str, str], Dict[str, int]] = {}
+
+    def record(self, prompt_name: str, model_name: str, estimated_prompt_tokens: int, prompt_tokens: int, output_tokens: int):
+        key = (_current_endpoint.get(), prompt_name, model_name)
+        entry = self._usage.get(key)
+        if entry is None:
+            entry = self._usage[key] = {
+                "calls": 0, "estimatedPromptTokens": 0, "promptTokens": 0, "outputTokens": 0
+            }
+        entry["calls"] += 1
+        entry["estimatedPromptTokens"] += estimated_prompt_tokens
+        entry["promptTokens"] += prompt_tokens
+        entry["outputTokens"] += output_tokens
+
+    def snapshot(self) -> List[dict]:
+        """Usage rows, most expensive (prompt + output tokens) first"""
+        rows = [
+            {"endpoint": endpoint, "prompt": prompt_name, "model": model_name, **counters}
+            for (endpoint, prompt_name, model_name), counters in self._usage.items()
+        ]
+        # Gerçek sayı yoksa (usage_metadata dönmediyse) tahmin kullanılır
+        rows.sort(key=lambda row: (row["promptTokens"] or row["estimatedPromptTokens"]) + row["outputTokens"], reverse=True)
+        return rows
+
+    def reset(self):
+        self._usage.clear()
+
+
+token_usage = TokenUsageStats()
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+from typing import Dict
+
+from firebase_config import get_db_pool
+from ai_service import get_ai_service
+
+
+def _warm_firestore(timeout: float):
+    """Open every pooled Firestore gRPC channel with a single cheap document read"""
+    for db in get_db_pool():
+        db.collection("notes").document("_warmup").get(timeout=timeout)
+
+
+def _warm_auth_keys(timeout: float):
+    """Pre-fetch the Firebase ID token signing certificates into the verifier's HTTP cache"""
+    import firebase_admin
+    from firebase_admin import auth as firebase_auth
+
+    # verify_id_token() indirdiği sertifikaları bu cache'li istek nesnesinde tutar.
+    # Public API yok; firebase_admin iç yapısı değişirse adım atlanır, ilk doğrulama sertifikaları indirir
+    try:
+        verifier = firebase_auth._get_client(firebase_admin.get_app())._token_verifier
+        cert_url = verifier.id_token_verifier.cert_url
+    except AttributeError as e:
+        print(f"Warm-up step 'auth_keys' skipped: firebase_admin internals changed ({e})")
+        return
+    verifier.request(url=cert_url, method="GET", timeout=timeout)
+
+
+def _warm_gemini(timeout: float):
+    """Open the Gemini gRPC channel with a count_tokens call (no generation quota used)"""
+    get_ai_service().model.count_tokens("ping", request_options={"timeout": timeout})
+
+
+def _run_in_daemon_thread(func, *args) -> asyncio.Future:
+    """
+    Run a blocking call in a daemon thread. Unlike the default executor, a
+    hung network call here can never block worker shutdown.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def set_result(result, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def target():
+        try:
+            result, error = func(*args), None
+        except Exception as e:
+            result, error = None, e
+        try:
+            loop.call_soon_threadsafe(set_result, result, error)
+        except RuntimeError:
+            pass  # loop already closed (worker shut down first)
+
+    threading.Thread(target=target, daemon=True).start()
+    return future
+
+
+async def warm_up(timeout: float) -> Dict[str, float]:
+    """
+    Run all warm-up steps concurrently in background threads.
+    Failures are logged and ignored; returns per-step durations in seconds.
+    """
+    steps = {
+        "firestore": _warm_firestore,
+        "auth_keys": _warm_auth_keys,
+        "gemini": _warm_gemini,
+    }
+    timings = {}
+
+    async def run_step(name, func):
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(_run_in_daemon_thread(func, timeout), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"Warm-up step '{name}' timed out")
+        except Exception as e:
+            print(f"Warm-up step '{name}' failed: {e}")
+        timings[name] = time.perf_counter() - started
+
+    await asyncio.gather(*(run_step(name, func) for name, func in steps.items()))
+    return timings